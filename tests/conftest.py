@@ -1,5 +1,7 @@
 import os
 
+import pytest
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 root_dir_content = os.listdir(BASE_DIR)
 PROJECT_DIR_NAME = 'yatube'
@@ -33,6 +35,22 @@ assert any(app in INSTALLED_APPS for app in ['posts.apps.PostsConfig', 'posts'])
     'Пожалуйста зарегистрируйте приложение в `settings.INSTALLED_APPS`'
 )
 
+
+@pytest.fixture(scope='session', autouse=True)
+def isolated_files():
+    from core.testing import isolated_files
+    with isolated_files():
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Тесты откатываются, и смена версий кэша после коммита до них не
+    # доходит: страница из прошлого теста не должна найтись в кэше.
+    from django.core.cache import cache
+    cache.clear()
+
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
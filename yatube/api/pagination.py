@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class PubDateCursorPagination(CursorPagination):
+    """Курсорная пагинация от новых объектов к старым без COUNT."""
+
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+class IdCursorPagination(PubDateCursorPagination):
+    ordering = ('id',)
@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from rest_framework import serializers
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class SparseFieldsMixin:
+    """Оставить в ответе только поля из ``?fields=id,text``."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        requested = request.query_params.get('fields')
+        if requested:
+            wanted = set(requested.split(','))
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+
+class GroupSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Group
+        fields = ('id', 'title', 'slug', 'description', 'posts_count')
+
+
+class PostSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    author = serializers.SlugRelatedField(
+        slug_field='username', read_only=True)
+    group = serializers.SlugRelatedField(
+        slug_field='slug', queryset=Group.objects.all(),
+        required=False, allow_null=True)
+
+    class Meta:
+        model = Post
+        fields = (
+            'id', 'text', 'author', 'group', 'image', 'pub_date', 'edited')
+        read_only_fields = ('pub_date', 'edited')
+
+
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    author = serializers.SlugRelatedField(
+        slug_field='username', read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ('id', 'post', 'author', 'text', 'pub_date')
+        read_only_fields = ('post', 'pub_date')
+
+
+class FollowSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    user = serializers.SlugRelatedField(
+        slug_field='username', read_only=True)
+    author = serializers.SlugRelatedField(
+        slug_field='username', queryset=User.objects.all())
+
+    class Meta:
+        model = Follow
+        fields = ('id', 'user', 'author')
+
+    def validate_author(self, author):
+        user = self.context['request'].user
+        if author == user:
+            raise serializers.ValidationError(
+                'Нельзя подписаться на самого себя')
+        if Follow.objects.filter(user=user, author=author).exists():
+            raise serializers.ValidationError(
+                'Вы уже подписаны на этого автора')
+        return author
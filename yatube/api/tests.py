@@ -0,0 +1,138 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core.testing import OnCommitMixin
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(OnCommitMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                group=cls.group,
+                text=f'Тестовый пост {i}',
+            )
+            for i in range(15)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(ApiTests.user)
+
+    def test_requires_authentication(self):
+        response = APIClient().get(reverse('api:posts-list'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_posts_cursor_pagination(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('api:posts-list'))
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('count', response.data)
+        ids = [post['id'] for post in response.data['results']]
+        response = self.client.get(response.data['next'])
+        ids += [post['id'] for post in response.data['results']]
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(ids, [post.id for post in ApiTests.posts[::-1]])
+
+    def test_sparse_fields(self):
+        response = self.client.get(
+            reverse('api:posts-detail', args=[ApiTests.posts[0].id]),
+            {'fields': 'id,author'})
+        self.assertEqual(
+            response.data, {'id': ApiTests.posts[0].id, 'author': 'author'})
+
+    def test_etag_and_if_none_match(self):
+        url = reverse('api:posts-detail', args=[ApiTests.posts[0].id])
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+        post = ApiTests.posts[0]
+        post.text = 'Новый текст'
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_group_etag_follows_posts_count(self):
+        for url in (reverse('api:groups-list'),
+                    reverse('api:groups-detail', args=[ApiTests.group.id])):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.captureOnCommitCallbacks(execute=True):
+                    Post.objects.create(
+                        author=ApiTests.author, group=ApiTests.group,
+                        text='Новый пост')
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                group = Group.objects.get(pk=ApiTests.group.pk)
+                data = response.data.get('results', [response.data])[0]
+                self.assertEqual(data['posts_count'], group.posts_count)
+
+    def test_post_etag_follows_group_slug(self):
+        for url in (reverse('api:posts-list'),
+                    reverse('api:posts-detail', args=[ApiTests.posts[0].id])):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                group = Group.objects.get(pk=ApiTests.group.pk)
+                group.slug = f'{group.slug}-new'
+                with self.captureOnCommitCallbacks(execute=True):
+                    group.save()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                data = response.data.get('results', [response.data])[0]
+                self.assertEqual(data['group'], group.slug)
+
+    def test_author_only_changes_post(self):
+        url = reverse('api:posts-detail', args=[ApiTests.posts[0].id])
+        response = self.client.patch(url, {'text': 'Чужой'})
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post(
+            reverse('api:posts-list'), {'text': 'Свой', 'group': 'test'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['author'], 'test')
+
+    def test_comments(self):
+        post = ApiTests.posts[0]
+        url = reverse('api:comments-list', kwargs={'post_id': post.id})
+        response = self.client.post(url, {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, 201)
+        comment = Comment.objects.get()
+        self.assertEqual((comment.post, comment.author), (post, ApiTests.user))
+        response = self.client.get(url)
+        self.assertEqual(response.data['results'][0]['text'], 'Комментарий')
+
+    def test_follow(self):
+        url = reverse('api:follow-list')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'author': 'author'})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Follow.objects.filter(
+            user=ApiTests.user, author=ApiTests.author).exists())
+        self.assertEqual(
+            self.client.post(url, {'author': 'author'}).status_code, 400)
+        self.assertEqual(
+            self.client.post(url, {'author': 'test'}).status_code, 400)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['author'], 'author')
@@ -0,0 +1,107 @@
+import hashlib
+
+from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import filters, mixins, status, viewsets
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from core.cache import get_versions
+from posts.models import Comment, Group, Post
+from api.pagination import IdCursorPagination, PubDateCursorPagination
+from api.permissions import IsAuthorOrReadOnly
+from api import serializers
+
+
+class ETagMixin:
+    """ETag и ответ 304 на ``If-None-Match`` без обращения к базе.
+
+    ETag строится из версий областей кэша ``core.cache``, которые сигналы
+    моделей увеличивают при каждом изменении, поэтому повторный опрос
+    неизменившегося списка стоит одного чтения из кэша. Области задаются
+    для действий в ``etag_scopes`` и могут ссылаться на аргументы URL и
+    ``{user}`` - id пользователя.
+    """
+
+    etag_scopes = {}
+
+    def get_etag(self, request):
+        scopes = [
+            scope.format(user=request.user.pk, **self.kwargs)
+            for scope in self.etag_scopes[self.action]
+        ]
+        raw = '|'.join(map(str, (
+            *get_versions(scopes), request.get_full_path(),
+            request.user.pk, request.accepted_media_type)))
+        return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+    def conditional(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if_none_match = parse_etags(
+            request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        response = handler(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+
+class PostViewSet(ETagMixin, viewsets.ModelViewSet):
+    queryset = Post.objects.for_feed()
+    serializer_class = serializers.PostSerializer
+    permission_classes = (IsAuthenticated, IsAuthorOrReadOnly)
+    pagination_class = PubDateCursorPagination
+    # Запись показывает slug группы, который меняется вместе с "groups".
+    etag_scopes = {
+        'list': ('feed', 'groups'), 'retrieve': ('post:{pk}', 'groups')}
+
+    def perform_create(self, serializer):
+        serializer.save(author=self.request.user)
+
+
+class GroupViewSet(ETagMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Group.objects.all()
+    serializer_class = serializers.GroupSerializer
+    pagination_class = IdCursorPagination
+    # posts_count меняется при создании, удалении и переносе записей, а
+    # они всегда увеличивают версию "feed".
+    etag_scopes = {
+        'list': ('groups', 'feed'), 'retrieve': ('groups', 'feed')}
+
+
+class CommentViewSet(ETagMixin, viewsets.ModelViewSet):
+    serializer_class = serializers.CommentSerializer
+    permission_classes = (IsAuthenticated, IsAuthorOrReadOnly)
+    pagination_class = PubDateCursorPagination
+    etag_scopes = {
+        'list': ('post:{post_id}',), 'retrieve': ('post:{post_id}',)}
+
+    def get_queryset(self):
+        return Comment.objects.filter(
+            post_id=self.kwargs['post_id']).select_related('author')
+
+    def perform_create(self, serializer):
+        post = get_object_or_404(Post, pk=self.kwargs['post_id'])
+        serializer.save(author=self.request.user, post=post)
+
+
+class FollowViewSet(ETagMixin, mixins.ListModelMixin,
+                    mixins.CreateModelMixin, mixins.DestroyModelMixin,
+                    viewsets.GenericViewSet):
+    serializer_class = serializers.FollowSerializer
+    pagination_class = IdCursorPagination
+    filter_backends = (filters.SearchFilter,)
+    search_fields = ('author__username',)
+    etag_scopes = {'list': ('follows:{user}',)}
+
+    def get_queryset(self):
+        return self.request.user.follower.select_related('user', 'author')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
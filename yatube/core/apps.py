@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from core.replicas import install_replica_guard
+        from core.sqlite import configure_connection
+        from core.sqlstats import install_collector
+        from core.timing import install_query_timer
+        connection_created.connect(configure_connection)
+        connection_created.connect(install_query_timer)
+        connection_created.connect(install_collector)
+        connection_created.connect(install_replica_guard)
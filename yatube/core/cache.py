@@ -0,0 +1,164 @@
+"""Версионированный кэш страниц с инвалидацией по событиям.
+
+Ключ страницы включает номера версий ее областей (например, ``feed`` или
+``group:cats``). Сигналы моделей увеличивают версию области через
+``bump``, и все страницы с прежней версией сразу перестают находиться в
+кэше, поэтому сам кэш можно держать сколько угодно долго.
+
+Те же версии служат валидаторами условных запросов: ``conditional_page``
+отвечает 304 по ETag и Last-Modified, не выполняя представление.
+
+Страница, прочитанная с реплики, которая еще не получила последнюю
+запись области (``core.replicas.is_fresh``), отдается, но не кэшируется
+и не получает валидаторов: иначе устаревшее содержимое закрепилось бы
+под новой версией до истечения кэша.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+
+from core import metrics, replicas
+
+VERSION_KEY = 'version:{}'
+MODIFIED_KEY = 'modified:{}'
+
+
+def _fresh_version():
+    # Версия, потерянная при вытеснении, не должна совпасть со старой.
+    return int(time.time() * 1000)
+
+
+def get_versions(scopes):
+    return get_validators(scopes)[0]
+
+
+def get_validators(scopes):
+    """Версии областей и время их последнего изменения (timestamp).
+
+    Если время изменения потеряно, им считается текущий момент: это
+    только заставит клиентов один лишний раз получить страницу целиком.
+    """
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    modified_keys = [MODIFIED_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys + modified_keys)
+    now = time.time()
+    missing = {key: _fresh_version() for key in keys if key not in found}
+    missing.update(
+        (key, now) for key in modified_keys if key not in found)
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    modified = max((found[key] for key in modified_keys), default=now)
+    return [found[key] for key in keys], modified
+
+
+def bump(*scopes):
+    """Сделать недействительными все страницы указанных областей.
+
+    Вызывается после коммита записи (``transaction.on_commit``), иначе
+    чтение до коммита закэширует старые данные под новой версией.
+    """
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), None)
+    now = time.time()
+    cache.set_many(
+        {MODIFIED_KEY.format(scope): now for scope in scopes}, None)
+
+
+def versioned_cache_page(timeout, *scopes, anonymous_only=False):
+    """Аналог ``cache_page``, ключ которого зависит от версий областей.
+
+    Области могут ссылаться на именованные аргументы представления:
+    ``versioned_cache_page(3600, 'group:{slug}')``. С ``anonymous_only``
+    страница кэшируется только для гостей - для страниц, содержимое
+    которых зависит от того, кто их смотрит.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if anonymous_only and request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            names = [scope.format(**kwargs) for scope in scopes]
+            versions, modified = get_validators(names)
+            prefix = '.'.join(
+                f'{name}={version}'
+                for name, version in zip(names, versions))
+            rendered = []
+
+            def render(request, *args, **kwargs):
+                rendered.append(True)
+                response = view(request, *args, **kwargs)
+                if not replicas.is_fresh(modified):
+                    # CacheMiddleware сохраняет ответ по этому флагу.
+                    request._cache_update_cache = False
+                return response
+
+            cached_view = cache_page(timeout, key_prefix=prefix)(render)
+            response = cached_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                metrics.cache_result('page', not rendered, bool(rendered))
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_page(*scopes):
+    """Ответ 304 на условный GET по версиям областей.
+
+    ETag зависит от версий областей и пользователя, а для авторизованных
+    еще и от CSRF-cookie: в их страницы вписан токен форм, и после нового
+    входа старая копия со старым токеном не должна получить 304.
+    Last-Modified - от времени последнего ``bump`` и отдается только
+    гостям (для авторизованных страница персональна). Оба валидатора
+    вычисляются одним чтением из кэша до вызова представления. Браузеру
+    разрешено хранить страницу, но перед показом он обязан ее перепроверить.
+    """
+    def validators(request, kwargs):
+        if not hasattr(request, '_page_validators'):
+            names = [scope.format(**kwargs) for scope in scopes]
+            versions, modified = get_validators(names)
+            user = request.user.pk
+            if request.user.is_authenticated:
+                user = f'{user}:{request.META.get("CSRF_COOKIE", "")}'
+            raw = '|'.join(map(str, (*names, *versions, user)))
+            etag = hashlib.md5(raw.encode()).hexdigest()
+            if request.user.is_authenticated:
+                last_modified = None
+            else:
+                last_modified = datetime.fromtimestamp(modified, timezone.utc)
+            request._page_validators = etag, last_modified, modified
+        return request._page_validators
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=lambda request, *args, **kwargs: validators(
+                request, kwargs)[0],
+            last_modified_func=lambda request, *args, **kwargs: validators(
+                request, kwargs)[1],
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if not replicas.is_fresh(validators(request, kwargs)[2]):
+                del response['ETag']
+                del response['Last-Modified']
+            if request.user.is_authenticated:
+                patch_cache_control(response, max_age=0, private=True)
+            else:
+                patch_cache_control(response, max_age=0)
+            if response.has_header('Expires'):
+                del response['Expires']
+            return response
+        return wrapper
+    return decorator
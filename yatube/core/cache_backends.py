@@ -0,0 +1,272 @@
+"""Кэш в файле SQLite (WAL), общий для всех процессов на одном хосте.
+
+В отличие от ``LocMemCache`` все воркеры видят одни и те же записи,
+поэтому инвалидация из ``core.cache.bump`` доходит до всех процессов, а
+память не дублируется. Подключение::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache_backends.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube/cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 50000, 'MAX_SIZE': 256 * 2 ** 20},
+        }
+    }
+
+``MAX_ENTRIES`` и ``MAX_SIZE`` (в байтах) ограничивают кэш; при
+превышении удаляются просроченные и давно не читавшиеся (LRU) записи.
+Целые числа хранятся как есть, поэтому ``incr`` атомарен между
+процессами.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires REAL,
+        accessed REAL NOT NULL,
+        size INTEGER NOT NULL
+    ) WITHOUT ROWID''',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    '''CREATE TABLE IF NOT EXISTS cache_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        entries INTEGER NOT NULL,
+        size INTEGER NOT NULL
+    )''',
+    'INSERT OR IGNORE INTO cache_stats VALUES (0, 0, 0)',
+    '''CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache
+    BEGIN
+        UPDATE cache_stats SET entries = entries + 1, size = size + NEW.size;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache
+    BEGIN
+        UPDATE cache_stats SET entries = entries - 1, size = size - OLD.size;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache
+    BEGIN
+        UPDATE cache_stats SET size = size + NEW.size - OLD.size;
+    END''',
+)
+
+UPSERT = '''
+    INSERT INTO cache (key, value, expires, accessed, size)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (key) DO UPDATE SET
+        value = excluded.value,
+        expires = excluded.expires,
+        accessed = excluded.accessed,
+        size = excluded.size
+'''
+
+CULL = '''
+    DELETE FROM cache WHERE key IN (
+        SELECT key FROM (
+            SELECT key,
+                   SUM(size) OVER recent AS kept_size,
+                   ROW_NUMBER() OVER recent AS kept_entries
+            FROM cache
+            WINDOW recent AS (ORDER BY accessed DESC)
+        )
+        WHERE kept_size > ? OR kept_entries > ?
+    )
+'''
+
+INT64 = range(-2 ** 63, 2 ** 63)
+
+
+class SQLiteCache(BaseCache):
+    # Не чаще, чем раз в столько секунд, обновлять время чтения записи:
+    # горячие ключи не должны превращать каждое чтение в запись.
+    access_resolution = 1.0
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 2 ** 20))
+        self._busy_timeout = int(options.get('BUSY_TIMEOUT', 5000))
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = self._connect()
+            local.pid = os.getpid()
+        return local.connection
+
+    def _connect(self):
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(
+            self._path, timeout=self._busy_timeout / 1000,
+            isolation_level=None)
+        connection.execute(f'PRAGMA busy_timeout = {self._busy_timeout}')
+        connection.execute('PRAGMA journal_mode = WAL')
+        connection.execute('PRAGMA synchronous = NORMAL')
+        with _transaction(connection):
+            for statement in SCHEMA:
+                connection.execute(statement)
+        return connection
+
+    @staticmethod
+    def _encode(value):
+        if type(value) is int and value in INT64:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _row(self, key, value, timeout):
+        encoded = self._encode(value)
+        size = len(key) + (
+            8 if isinstance(encoded, int) else len(encoded))
+        return (key, encoded, self.get_backend_timeout(timeout),
+                time.time(), size)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._get_many([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        found = self._get_many(list(keys))
+        return {keys[key]: value for key, value in found.items()}
+
+    def _get_many(self, keys):
+        if not keys:
+            return {}
+        now = time.time()
+        placeholders = ', '.join('?' * len(keys))
+        rows = self._db.execute(
+            'SELECT key, value, expires, accessed FROM cache '
+            f'WHERE key IN ({placeholders})', keys).fetchall()
+        found, stale = {}, []
+        for key, value, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                continue
+            found[key] = self._decode(value)
+            if accessed < now - self.access_resolution:
+                stale.append(key)
+        if stale:
+            placeholders = ', '.join('?' * len(stale))
+            self._db.execute(
+                f'UPDATE cache SET accessed = ? WHERE key IN ({placeholders})',
+                [now, *stale])
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        rows = [
+            self._row(self._key(key, version), value, timeout)
+            for key, value in data.items()
+        ]
+        db = self._db
+        with _transaction(db):
+            db.executemany(UPSERT, rows)
+            self._cull(db)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        row = self._row(self._key(key, version), value, timeout)
+        db = self._db
+        with _transaction(db):
+            db.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (row[0], row[3]))
+            added = db.execute(
+                'INSERT OR IGNORE INTO cache '
+                '(key, value, expires, accessed, size) '
+                'VALUES (?, ?, ?, ?, ?)', row).rowcount == 1
+            if added:
+                self._cull(db)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return self._db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time())
+        ).rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        db = self._db
+        with _transaction(db):
+            row = db.execute(
+                'SELECT value, expires FROM cache WHERE key = ?',
+                (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= time.time()):
+                raise ValueError(f"Key '{key}' not found")
+            value = self._decode(row[0]) + delta
+            encoded = self._encode(value)
+            size = len(key) + (
+                8 if isinstance(encoded, int) else len(encoded))
+            db.execute(
+                'UPDATE cache SET value = ?, size = ?, accessed = ? '
+                'WHERE key = ?', (encoded, size, time.time(), key))
+        return value
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._db.execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time())).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        return self._db.execute(
+            'DELETE FROM cache WHERE key = ?', (key,)).rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        keys = [(self._key(key, version),) for key in keys]
+        db = self._db
+        with _transaction(db):
+            db.executemany('DELETE FROM cache WHERE key = ?', keys)
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def _cull(self, db):
+        entries, size = db.execute(
+            'SELECT entries, size FROM cache_stats').fetchone()
+        if entries <= self._max_entries and size <= self._max_size:
+            return
+        db.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        keep = 1 - 1 / self._cull_frequency if self._cull_frequency else 0
+        db.execute(
+            CULL, (int(self._max_size * keep), int(self._max_entries * keep)))
+
+
+class _transaction:
+    """``BEGIN IMMEDIATE`` ... ``COMMIT`` для соединения в autocommit."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
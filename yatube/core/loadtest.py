@@ -0,0 +1,277 @@
+"""Повтор журнала запросов (JSONL) как нагрузочный тест.
+
+Каждая строка трассы - объект с полями ``method`` (по умолчанию GET),
+``path`` (с query string), ``user`` (имя пользователя или ``null`` для
+гостя), ``body`` (словарь полей формы или строка) и, по желанию,
+``content_type``. Запросы раздаются пулу из ``workers`` потоков; при
+заданном ``rate`` запрос N отправляется не раньше ``N / rate`` секунд от
+старта, а задержка считается от этого запланированного момента, так что
+очередь перед перегруженным сервером тоже попадает в перцентили.
+
+Цель - либо само WSGI-приложение через тестовый клиент Django
+(``InProcessTarget``), либо сервер на локальном сокете
+(``SocketTarget``). Пользователи в обоих случаях входят через
+настоящую сессию, а POST-запросы несут CSRF-токен.
+"""
+import http.client
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.test import Client
+from django.urls import Resolver404, resolve
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def read_trace(lines):
+    """Записи трассы из строк JSONL; пустые строки пропускаются."""
+    records = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            raise ValueError(f'Строка {number}: {error}') from error
+        if 'path' not in record:
+            raise ValueError(f'Строка {number}: нет поля path')
+        record.setdefault('method', 'GET')
+        record['method'] = record['method'].upper()
+        records.append(record)
+    return records
+
+
+def url_name(path):
+    try:
+        return resolve(urlsplit(path).path).view_name
+    except Resolver404:
+        return '-'
+
+
+class _Sessions:
+    """Cookie сессии и CSRF-токены пользователей трассы."""
+
+    def __init__(self):
+        self.cookies = {}
+        self.lock = threading.Lock()
+
+    def get(self, username):
+        with self.lock:
+            if username not in self.cookies:
+                self.cookies[username] = self.login(username)
+            return self.cookies[username]
+
+    def login(self, username):
+        cookies = {}
+        if username:
+            client = Client()
+            client.force_login(
+                get_user_model().objects.get(username=username))
+            name = settings.SESSION_COOKIE_NAME
+            cookies[name] = client.cookies[name].value
+        request = HttpRequest()
+        token = get_token(request)
+        cookies[settings.CSRF_COOKIE_NAME] = request.META['CSRF_COOKIE']
+        return cookies, token
+
+
+def _encode_body(record):
+    body = record.get('body')
+    if body is None:
+        return b'', None
+    if isinstance(body, dict):
+        return (urlencode(body, doseq=True).encode(),
+                'application/x-www-form-urlencoded')
+    return (body.encode(),
+            record.get('content_type', 'application/octet-stream'))
+
+
+class InProcessTarget:
+    """Запросы прямо в WSGI-приложение через тестовый клиент."""
+
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.client = Client()
+
+    def send(self, record):
+        cookies, token = self.sessions.get(record.get('user'))
+        self.client.cookies.clear()
+        for name, value in cookies.items():
+            self.client.cookies[name] = value
+        body, content_type = _encode_body(record)
+        response = self.client.generic(
+            record['method'], record['path'], body,
+            content_type or 'application/octet-stream',
+            HTTP_X_CSRFTOKEN=token)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        return response.status_code, size
+
+    def close(self):
+        connections.close_all()
+
+
+class SocketTarget:
+    """Запросы по HTTP к серверу на ``host:port`` с keep-alive."""
+
+    def __init__(self, sessions, host, port):
+        self.sessions = sessions
+        self.host = host
+        self.port = port
+        self.connection = None
+
+    def send(self, record):
+        cookies, token = self.sessions.get(record.get('user'))
+        body, content_type = _encode_body(record)
+        headers = {
+            'Cookie': '; '.join(f'{k}={v}' for k, v in cookies.items()),
+            'X-CSRFToken': token,
+            'Host': f'{self.host}:{self.port}',
+        }
+        if content_type:
+            headers['Content-Type'] = content_type
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(
+                    self.host, self.port, timeout=30)
+            try:
+                self.connection.request(
+                    record['method'], record['path'], body, headers)
+                response = self.connection.getresponse()
+                size = len(response.read())
+                if response.getheader('Connection', '').lower() == 'close':
+                    self.close()
+                return response.status, size
+            except (http.client.HTTPException, ConnectionError):
+                # Сервер закрыл простаивавшее соединение: одна попытка
+                # на новом.
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def _jobs(records, repeat):
+    jobs = queue.SimpleQueue()
+    for number, record in enumerate(
+            record for _ in range(repeat) for record in records):
+        jobs.put((number, record))
+    return jobs
+
+
+def _new_result():
+    return {
+        'latencies': [], 'statuses': defaultdict(int), 'errors': 0,
+        'bytes': 0}
+
+
+class _Run:
+    """Общее состояние потоков одного прогона."""
+
+    def __init__(self, records, make_target, rate, repeat):
+        self.sessions = _Sessions()
+        self.jobs = _jobs(records, repeat)
+        self.make_target = make_target
+        self.rate = rate
+        self.results = defaultdict(_new_result)
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+
+    def due(self, number):
+        """Запланированный момент отправки запроса ``number``."""
+        if self.rate:
+            return self.started + number / self.rate
+        return time.perf_counter()
+
+    def send(self, target, number, record):
+        due = self.due(number)
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            status, size = target.send(record)
+        except Exception as error:
+            status, size = type(error).__name__, 0
+        latency = time.perf_counter() - due
+        failed = not isinstance(status, int) or status >= 500
+        with self.lock:
+            result = self.results[url_name(record['path'])]
+            result['latencies'].append(latency)
+            result['statuses'][str(status)] += 1
+            result['bytes'] += size
+            result['errors'] += failed
+
+    def work(self):
+        target = self.make_target(self.sessions)
+        try:
+            while True:
+                try:
+                    number, record = self.jobs.get_nowait()
+                except queue.Empty:
+                    return
+                self.send(target, number, record)
+        finally:
+            target.close()
+
+
+def _run_threads(target, count):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def replay(records, make_target, workers=4, rate=None, repeat=1):
+    """Повторить записи и вернуть итоги по именам URL.
+
+    ``make_target(sessions)`` создает цель для одного потока.
+    """
+    run = _Run(records, make_target, rate, repeat)
+    _run_threads(run.work, workers)
+    return summarize(run.results, time.perf_counter() - run.started)
+
+
+def summarize(results, elapsed):
+    report = {'elapsed_s': round(elapsed, 3), 'urls': {}}
+    total = errors = 0
+    for name, result in sorted(results.items()):
+        latencies = result['latencies']
+        count = len(latencies)
+        total += count
+        errors += result['errors']
+        report['urls'][name] = {
+            'requests': count,
+            'throughput_rps': round(count / elapsed, 2) if elapsed else 0,
+            'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+            'error_rate': round(result['errors'] / count, 4),
+            'statuses': dict(sorted(result['statuses'].items())),
+            'bytes': result['bytes'],
+        }
+    report['requests'] = total
+    report['throughput_rps'] = round(total / elapsed, 2) if elapsed else 0
+    report['error_rate'] = round(errors / total, 4) if total else 0
+    return report
@@ -0,0 +1,72 @@
+"""Отправка почты через очередь задач.
+
+``QueuedEmailBackend`` только ставит письма в очередь, а отправляет их
+воркер (``manage.py runworker``) через настоящий бэкенд из
+``QUEUED_EMAIL_BACKEND``, поэтому запрос не ждет почтового сервера.
+Вложения-файлы передаются в задаче в base64. Письма с вложениями, которые
+так не передать (готовые MIME-части, вложенные письма), отправляются
+сразу, в запросе.
+"""
+import base64
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from core.tasks import enqueue
+
+
+def encode_attachment(attachment):
+    filename, content, mimetype = attachment
+    if isinstance(content, str):
+        return [filename, content, mimetype, False]
+    return [filename, base64.b64encode(content).decode(), mimetype, True]
+
+
+def can_queue(email):
+    return all(
+        isinstance(attachment, tuple)
+        and isinstance(attachment[1], (str, bytes))
+        for attachment in email.attachments)
+
+
+def send_email(message):
+    attachments = message.pop('attachments', [])
+    email = EmailMultiAlternatives(
+        connection=get_connection(settings.QUEUED_EMAIL_BACKEND),
+        **message)
+    for filename, content, mimetype, encoded in attachments:
+        if encoded:
+            content = base64.b64decode(content)
+        email.attach(filename, content, mimetype)
+    email.send()
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        immediate = []
+        for email in email_messages:
+            if not can_queue(email):
+                immediate.append(email)
+                continue
+            enqueue(send_email, {
+                'subject': email.subject,
+                'body': email.body,
+                'from_email': email.from_email,
+                'to': email.to,
+                'cc': email.cc,
+                'bcc': email.bcc,
+                'reply_to': email.reply_to,
+                'headers': email.extra_headers,
+                'alternatives': getattr(email, 'alternatives', []),
+                'attachments': [
+                    encode_attachment(attachment)
+                    for attachment in email.attachments],
+            })
+        sent = len(email_messages) - len(immediate)
+        if immediate:
+            connection = get_connection(
+                settings.QUEUED_EMAIL_BACKEND,
+                fail_silently=self.fail_silently)
+            sent += connection.send_messages(immediate) or 0
+        return sent
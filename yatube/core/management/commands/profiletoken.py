@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = 'Выдает токен для профилирования запросов (заголовок X-Profile)'
+
+    def handle(self, *args, **options):
+        token = make_token()
+        self.stdout.write(token)
+        self.stderr.write(
+            f'Действует {settings.PROFILE_TOKEN_MAX_AGE} с: '
+            f'curl -H "X-Profile: {token}" ... или ?profile={token}')
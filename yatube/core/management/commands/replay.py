@@ -0,0 +1,67 @@
+import json
+from functools import partial
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import InProcessTarget, SocketTarget, read_trace, replay
+
+
+class Command(BaseCommand):
+    help = ('Повторяет трассу запросов из JSONL в несколько потоков и '
+            'показывает пропускную способность, задержки и ошибки по URL')
+
+    def add_arguments(self, parser):
+        parser.add_argument('trace', help='Файл JSONL с запросами')
+        parser.add_argument(
+            '--workers', type=int, default=4, help='Число потоков')
+        parser.add_argument(
+            '--rate', type=float, default=None,
+            help='Запросов в секунду (по умолчанию - без пауз)')
+        parser.add_argument(
+            '--repeat', type=int, default=1,
+            help='Сколько раз пройти трассу')
+        parser.add_argument(
+            '--target',
+            help='Адрес сервера, например http://127.0.0.1:8000; '
+                 'без него запросы идут прямо в приложение')
+        parser.add_argument(
+            '--json', action='store_true', help='Вывести результат в JSON')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['trace']) as trace:
+                records = read_trace(trace)
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        if not records:
+            raise CommandError('В трассе нет запросов')
+        if options['target']:
+            url = urlsplit(options['target'])
+            if url.scheme != 'http' or not url.hostname:
+                raise CommandError('Нужен адрес вида http://host:port')
+            make_target = partial(
+                SocketTarget, host=url.hostname, port=url.port or 80)
+        else:
+            make_target = InProcessTarget
+        report = replay(
+            records, make_target, workers=options['workers'],
+            rate=options['rate'], repeat=options['repeat'])
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+        self.stdout.write(
+            f'{"URL":<28} {"запр.":>6} {"зап/с":>8} {"p50":>8} {"p95":>8} '
+            f'{"p99":>8} {"ошибки":>7}')
+        for name, row in report['urls'].items():
+            self.stdout.write(
+                f'{name:<28} {row["requests"]:6d} '
+                f'{row["throughput_rps"]:8.1f} {row["p50_ms"]:8.1f} '
+                f'{row["p95_ms"]:8.1f} {row["p99_ms"]:8.1f} '
+                f'{row["error_rate"]:7.1%}')
+        style = self.style.SUCCESS if not report['error_rate'] else (
+            self.style.WARNING)
+        self.stdout.write(style(
+            f'Всего {report["requests"]} запросов за '
+            f'{report["elapsed_s"]} с: {report["throughput_rps"]} зап/с, '
+            f'ошибок {report["error_rate"]:.1%}'))
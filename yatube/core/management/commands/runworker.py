@@ -0,0 +1,81 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.tasks import Worker
+
+
+def _work(stop, poll_interval, burst):
+    try:
+        Worker(poll_interval).run(stop, burst)
+    finally:
+        connections.close_all()
+
+
+def _work_in_process(stop, poll_interval, burst):
+    # Ctrl+C получает вся группа процессов; останавливает их родитель.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _work(stop, poll_interval, burst)
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди core.Task'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.TASK_WORKERS,
+            help='Сколько задач выполнять одновременно')
+        parser.add_argument(
+            '--processes',
+            action='store_true',
+            help='Запускать воркеры процессами, а не потоками')
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Пауза в секундах, когда очередь пуста')
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Завершиться, когда очередь опустеет')
+
+    def handle(self, *args, **options):
+        if options['processes']:
+            # Соединения с базой нельзя наследовать дочерним процессам.
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            stop = context.Event()
+            workers = [
+                context.Process(
+                    target=_work_in_process,
+                    args=(stop, options['poll_interval'], options['burst']))
+                for _ in range(options['workers'])
+            ]
+        else:
+            stop = threading.Event()
+            workers = [
+                threading.Thread(
+                    target=_work,
+                    args=(stop, options['poll_interval'], options['burst']),
+                    name=f'worker-{number}')
+                for number in range(options['workers'])
+            ]
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        for worker in workers:
+            worker.start()
+        self.stdout.write(
+            f'Запущено воркеров: {len(workers)}, Ctrl+C для остановки')
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            stop.set()
+            for worker in workers:
+                worker.join()
+        self.stdout.write(self.style.SUCCESS('Воркеры остановлены'))
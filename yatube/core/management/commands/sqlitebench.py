@@ -0,0 +1,194 @@
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.loadtest import percentile
+from core.sqlite import apply_pragmas, is_busy
+
+SCHEMA = (
+    '''CREATE TABLE post (
+        id INTEGER PRIMARY KEY,
+        text TEXT NOT NULL,
+        pub_date REAL NOT NULL,
+        comments_count INTEGER NOT NULL DEFAULT 0
+    )''',
+    'CREATE INDEX post_pub_date ON post (pub_date)',
+    '''CREATE TABLE comment (
+        id INTEGER PRIMARY KEY,
+        post_id INTEGER NOT NULL REFERENCES post (id),
+        text TEXT NOT NULL,
+        pub_date REAL NOT NULL
+    )''',
+    'CREATE INDEX comment_post ON comment (post_id, pub_date)',
+)
+POSTS = 2000
+
+
+class Profile:
+    """Настройки соединения: стандартные или из ``SQLITE_PRAGMAS``."""
+
+    def __init__(self, name, pragmas, retries):
+        self.name = name
+        self.pragmas = pragmas
+        self.retries = retries
+
+    def connect(self, path):
+        # Как Django: autocommit, транзакции начинаются явным BEGIN.
+        db = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False)
+        apply_pragmas(db, self.pragmas)
+        return db
+
+    def run(self, operation):
+        """Выполнить операцию; вернуть число ошибок "database is locked"."""
+        delay = settings.SQLITE_BUSY_RETRY_DELAY
+        for attempt in range(self.retries + 1):
+            try:
+                operation()
+                return 0
+            except sqlite3.OperationalError as error:
+                if not is_busy(error) or attempt == self.retries:
+                    return 1
+                time.sleep(delay * 2 ** attempt)
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест SQLite: конкурентные писатели и читатели '
+            'со стандартными и настроенными прагмами')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument(
+            '--seconds', type=float, default=5,
+            help='Длительность каждого прогона')
+        parser.add_argument(
+            '--json', action='store_true', help='Вывести результат в JSON')
+
+    def handle(self, *args, **options):
+        profiles = (
+            Profile('stock', {}, retries=0),
+            Profile(
+                'tuned', settings.SQLITE_PRAGMAS,
+                retries=settings.SQLITE_BUSY_RETRIES),
+        )
+        results = [self.bench(profile, options) for profile in profiles]
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for result in results:
+            self.stdout.write(
+                '{profile:>6}: записей {writes_per_second:>8.1f}/с, '
+                'чтений {reads_per_second:>8.1f}/с, '
+                'ошибок записи {write_errors}, '
+                'p99 записи {write_p99_ms:.1f} мс, '
+                'p99 чтения {read_p99_ms:.1f} мс'.format(**result))
+
+    def bench(self, profile, options):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'bench.sqlite3')
+        try:
+            self.prepare(profile, path)
+            return self.measure(profile, path, options)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def prepare(self, profile, path):
+        db = profile.connect(path)
+        now = time.time()
+        db.execute('BEGIN')
+        for statement in SCHEMA:
+            db.execute(statement)
+        db.executemany(
+            'INSERT INTO post (text, pub_date) VALUES (?, ?)',
+            ((f'Пост {i}', now - i) for i in range(POSTS)))
+        db.execute('COMMIT')
+        db.close()
+
+    def measure(self, profile, path, options):
+        stop = threading.Event()
+        lock = threading.Lock()
+        stats = {'writes': [], 'reads': [], 'write_errors': 0,
+                 'read_errors': 0}
+
+        def writer():
+            db = profile.connect(path)
+
+            def comment():
+                db.execute('BEGIN')
+                try:
+                    post_id = random.randint(1, POSTS)
+                    db.execute(
+                        'INSERT INTO comment (post_id, text, pub_date) '
+                        'VALUES (?, ?, ?)', (post_id, 'Комментарий',
+                                             time.time()))
+                    db.execute(
+                        'UPDATE post SET comments_count = comments_count + 1'
+                        ' WHERE id = ?', (post_id,))
+                    db.execute('COMMIT')
+                except sqlite3.Error:
+                    db.execute('ROLLBACK')
+                    raise
+            self.loop(stop, lock, stats, profile, comment, 'writes')
+            db.close()
+
+        def reader():
+            db = profile.connect(path)
+
+            def page():
+                offset = random.randrange(0, POSTS, 10)
+                posts = db.execute(
+                    'SELECT id, text, comments_count FROM post '
+                    'ORDER BY pub_date DESC LIMIT 10 OFFSET ?',
+                    (offset,)).fetchall()
+                db.execute(
+                    'SELECT text FROM comment WHERE post_id = ? '
+                    'ORDER BY pub_date DESC LIMIT 20',
+                    (posts[0][0],)).fetchall()
+            self.loop(stop, lock, stats, profile, page, 'reads')
+            db.close()
+
+        threads = (
+            [threading.Thread(target=writer)
+             for _ in range(options['writers'])]
+            + [threading.Thread(target=reader)
+               for _ in range(options['readers'])])
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        seconds = options['seconds']
+        return {
+            'profile': profile.name,
+            'writers': options['writers'],
+            'readers': options['readers'],
+            'writes_per_second': len(stats['writes']) / seconds,
+            'reads_per_second': len(stats['reads']) / seconds,
+            'write_errors': stats['write_errors'],
+            'read_errors': stats['read_errors'],
+            'write_p99_ms': percentile(stats['writes'], 0.99) * 1000,
+            'read_p99_ms': percentile(stats['reads'], 0.99) * 1000,
+        }
+
+    @staticmethod
+    def loop(stop, lock, stats, profile, operation, kind):
+        errors = kind[:-1] + '_errors'
+        while not stop.is_set():
+            started = time.perf_counter()
+            failed = profile.run(operation)
+            elapsed = time.perf_counter() - started
+            with lock:
+                if failed:
+                    stats[errors] += 1
+                else:
+                    stats[kind].append(elapsed)
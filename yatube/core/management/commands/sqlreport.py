@@ -0,0 +1,55 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.sqlstats import QUERY_SECONDS, report
+
+ORDERS = ('total', 'count', 'p99')
+
+
+class Command(BaseCommand):
+    help = ('Показывает SQL-запросы, на которые уходит больше всего '
+            'времени базы, по отпечаткам и представлениям')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Сколько строк показать')
+        parser.add_argument(
+            '--order', choices=ORDERS, default='total',
+            help='Сортировка: общее время, число или p99')
+        parser.add_argument(
+            '--by-view', action='store_true',
+            help='Отдельная строка на каждое представление')
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Вывести результат в JSON')
+
+    def handle(self, *args, **options):
+        order = options['order']
+        rows = sorted(
+            report(by_view=options['by_view']),
+            key=lambda row: float('inf') if row[order] is None else row[order],
+            reverse=True,
+        )[:options['limit']]
+        if options['json']:
+            self.stdout.write(json.dumps(rows, ensure_ascii=False, indent=2))
+            return
+        if not rows:
+            self.stdout.write('Статистики пока нет')
+            return
+        self.stdout.write(
+            f'{"всего, мс":>11} {"число":>8} {"сред., мс":>10} '
+            f'{"p99, мс":>9}  запрос')
+        for row in rows:
+            self.stdout.write(
+                f'{row["total"] * 1000:11.1f} {row["count"]:8d} '
+                f'{row["total"] * 1000 / row["count"]:10.2f} '
+                f'{self.format_p99(row["p99"]):>9}  '
+                f'{row["view"] + " " if row["view"] else ""}'
+                f'[{row["fingerprint"]}] {row["sql"][:200]}')
+
+    def format_p99(self, p99):
+        if p99 is None:
+            return f'>{QUERY_SECONDS.buckets[-1] * 1000:.0f}'
+        return f'≤{p99 * 1000:.1f}'
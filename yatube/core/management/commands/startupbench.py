@@ -0,0 +1,104 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.startup import app_module, group_by_app, parse_importtime
+
+# Выполняется в отдельном процессе с -X importtime: время этапов в stdout,
+# время импорта модулей - в stderr.
+SCRIPT = '''
+import json, time
+started = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+wsgi = time.perf_counter()
+from core.startup import warm
+warm()
+warmed = time.perf_counter()
+print(json.dumps({
+    'setup_ms': (setup - started) * 1000,
+    'wsgi_ms': (wsgi - setup) * 1000,
+    'warm_ms': (warmed - wsgi) * 1000,
+    'apps': settings.INSTALLED_APPS,
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = ('Измеряет запуск воркера: django.setup, загрузку WSGI, прогрев '
+            'и время импорта по приложениям')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'modules', nargs='*',
+            help='Модули настроек для сравнения, например '
+                 'yatube.settings.dev yatube.settings.prod')
+        parser.add_argument(
+            '--runs', type=int, default=3,
+            help='Число запусков; берется медиана')
+        parser.add_argument(
+            '--top', type=int, default=15,
+            help='Сколько самых медленных пакетов показать')
+        parser.add_argument(
+            '--json', action='store_true', help='Вывести результат в JSON')
+
+    def handle(self, *args, **options):
+        modules = options['modules'] or [os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'yatube.settings')]
+        report = {
+            module: self.measure(module, options['runs'])
+            for module in modules
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for module, result in report.items():
+            self.stdout.write(self.style.SUCCESS(module))
+            self.stdout.write(
+                f'  setup {result["setup_ms"]:.0f} мс, '
+                f'wsgi {result["wsgi_ms"]:.0f} мс, '
+                f'прогрев {result["warm_ms"]:.0f} мс')
+            imports = sorted(
+                result['imports_ms'].items(), key=lambda item: -item[1])
+            for name, elapsed in imports[:options['top']]:
+                marker = '*' if name in result['apps'] else ' '
+                self.stdout.write(f'  {marker} {name:<32} {elapsed:8.1f} мс')
+        self.stdout.write('* - приложение из INSTALLED_APPS')
+
+    def measure(self, module, runs):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': module}
+        phases = defaultdict(list)
+        imports = defaultdict(list)
+        for _ in range(runs):
+            process = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', SCRIPT],
+                cwd=settings.BASE_DIR, env=env, capture_output=True,
+                text=True)
+            if process.returncode:
+                raise CommandError(process.stderr.strip().splitlines()[-1])
+            result = json.loads(process.stdout.strip().splitlines()[-1])
+            for phase in ('setup_ms', 'wsgi_ms', 'warm_ms'):
+                phases[phase].append(result[phase])
+            apps = [app_module(app) for app in result['apps']]
+            groups = group_by_app(
+                parse_importtime(process.stderr), result['apps'])
+            for name, own in groups.items():
+                imports[name].append(own / 1000)
+        return {
+            **{phase: statistics.median(values)
+               for phase, values in phases.items()},
+            'imports_ms': {
+                name: round(statistics.median(values), 1)
+                for name, values in imports.items()},
+            'apps': apps,
+        }
@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from core.replicas import copy_database, mark_synced
+
+SQLITE = 'django.db.backends.sqlite3'
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite во все реплики'
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if primary['ENGINE'] != SQLITE:
+            raise CommandError('Копирование поддерживается только для SQLite')
+        if not settings.DATABASE_REPLICAS:
+            self.stdout.write('Реплики не настроены (DATABASE_REPLICAS)')
+            return
+        for alias in settings.DATABASE_REPLICAS:
+            replica = settings.DATABASES[alias]
+            if replica['ENGINE'] != SQLITE:
+                raise CommandError(f'Реплика {alias} - не SQLite')
+            # Все, что закоммичено до начала копии, в нее попадет.
+            started = time.time()
+            copy_database(primary['NAME'], replica['NAME'])
+            mark_synced(alias, started)
+            self.stdout.write(self.style.SUCCESS(
+                f'{alias}: скопировано в {replica["NAME"]}'))
@@ -0,0 +1,329 @@
+"""Метрики в формате Prometheus, общие для всех процессов хоста.
+
+Счетчики и гистограммы объявляются на уровне модуля (``Counter``,
+``Histogram``) и копятся в памяти: у каждого потока свой словарь, поэтому
+запись - это одно сложение без блокировок. Раз в
+``METRICS_FLUSH_INTERVAL`` секунд (и при выходе из процесса) процесс
+записывает свои накопленные итоги в файл SQLite ``METRICS_PATH`` - по
+строке на процесс и серию, так что повторная запись ничего не портит.
+Представление ``metrics`` складывает строки всех процессов; итоги
+завершившихся процессов при этом сворачиваются в общую строку, и
+счетчики не убывают после перезапуска воркеров.
+
+Словарь потока живет, пока жив поток: когда поток завершается, его итоги
+переносятся в общий словарь процесса, поэтому серверы, создающие поток на
+соединение, не копят словари без конца.
+
+Корзины гистограмм хранятся по отдельности и накапливаются (``le``)
+только при выводе.
+"""
+import atexit
+import bisect
+import logging
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from collections import defaultdict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''CREATE TABLE IF NOT EXISTS metrics (
+    process TEXT NOT NULL,
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    le TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (process, name, labels, le)
+) WITHOUT ROWID'''
+
+UPSERT = '''
+    INSERT INTO metrics (process, name, labels, le, value)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (process, name, labels, le) DO UPDATE SET
+        value = excluded.value
+'''
+
+# Итоги завершившихся процессов.
+RETIRED = ''
+
+RETIRE = '''
+    INSERT INTO metrics (process, name, labels, le, value)
+    SELECT ?, name, labels, le, value FROM metrics WHERE process = ?
+    ON CONFLICT (process, name, labels, le) DO UPDATE SET
+        value = value + excluded.value
+'''
+
+_families = {}
+
+
+class _Process:
+    """Данные текущего процесса; после ``fork`` создаются заново."""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.token = f'{self.pid}:{time.time_ns()}'
+        self.shards = []
+        # Итоги завершившихся потоков.
+        self.retired = defaultdict(float)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.next_flush = 0
+        self.db = threading.local()
+
+
+_process = _Process()
+
+
+def _current():
+    global _process
+    if _process.pid != os.getpid():
+        _process = _Process()
+    return _process
+
+
+class _Owner:
+    """Хранится только в ``threading.local`` и умирает вместе с потоком."""
+
+
+def _retire_shard(process, shard):
+    with process.lock:
+        process.shards.remove(shard)
+        for key, value in shard.items():
+            process.retired[key] += value
+
+
+def _shard():
+    process = _current()
+    shard = getattr(process.local, 'values', None)
+    if shard is None:
+        shard = process.local.values = defaultdict(float)
+        process.local.owner = owner = _Owner()
+        with process.lock:
+            process.shards.append(shard)
+        weakref.finalize(owner, _retire_shard, process, shard)
+    return shard
+
+
+def _escape(value):
+    return (str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        _families[name] = self
+
+    def _labels(self, values):
+        return ','.join(
+            f'{name}="{_escape(value)}"'
+            for name, value in zip(self.labelnames, values))
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        _shard()[self.name, self._labels(labels), ''] += amount
+        maybe_flush()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+
+    def observe(self, value, *labels):
+        shard = _shard()
+        labels = self._labels(labels)
+        le = self.bounds[bisect.bisect_left(self.buckets, value)]
+        shard[self.name, labels, le] += 1
+        shard[self.name, labels, ''] += value
+        maybe_flush()
+
+
+def snapshot():
+    """Итоги текущего процесса по всем потокам."""
+    process = _current()
+    with process.lock:
+        shards = list(process.shards)
+        totals = defaultdict(float, process.retired)
+    for shard in shards:
+        # dict.copy не отпускает GIL, поэтому копия согласована.
+        for key, value in shard.copy().items():
+            totals[key] += value
+    return totals
+
+
+def reset():
+    """Забыть несброшенные итоги процесса (для тестов)."""
+    global _process
+    _process = _Process()
+
+
+def connect():
+    """Соединение текущего потока с общим файлом метрик."""
+    process = _current()
+    path = settings.METRICS_PATH
+    if getattr(process.db, 'path', None) != path:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(path, timeout=5, isolation_level=None)
+        db.execute('PRAGMA journal_mode = WAL')
+        db.execute('PRAGMA synchronous = NORMAL')
+        db.execute(SCHEMA)
+        process.db.connection, process.db.path = db, path
+    return process.db.connection
+
+
+def flush():
+    """Записать итоги процесса в общий файл."""
+    process = _current()
+    process.next_flush = time.monotonic() + settings.METRICS_FLUSH_INTERVAL
+    rows = [
+        (process.token, *key, value) for key, value in snapshot().items()]
+    if rows:
+        db = connect()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.executemany(UPSERT, rows)
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+
+def maybe_flush():
+    if time.monotonic() >= _process.next_flush:
+        # Метрики не должны ронять запрос: итоги уйдут со следующим сбросом.
+        try:
+            flush()
+        except sqlite3.Error:
+            logger.warning('Не удалось сбросить метрики', exc_info=True)
+
+
+def _alive(token):
+    pid = int(token.split(':')[0])
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _retire_dead(db):
+    tokens = [token for (token,) in db.execute(
+        'SELECT DISTINCT process FROM metrics WHERE process != ?',
+        (RETIRED,))]
+    dead = [
+        token for token in tokens
+        if token != _process.token and not _alive(token)]
+    if not dead:
+        return
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        for token in dead:
+            db.execute(RETIRE, (RETIRED, token))
+            db.execute('DELETE FROM metrics WHERE process = ?', (token,))
+    except BaseException:
+        db.execute('ROLLBACK')
+        raise
+    db.execute('COMMIT')
+
+
+def collect():
+    """Итоги всех процессов: ``{(name, labels, le): value}``."""
+    flush()
+    db = connect()
+    _retire_dead(db)
+    return {
+        (name, labels, le): value
+        for name, labels, le, value in db.execute(
+            'SELECT name, labels, le, SUM(value) FROM metrics '
+            'GROUP BY name, labels, le')
+    }
+
+
+def _sample(name, labels, value):
+    if labels:
+        name = f'{name}{{{labels}}}'
+    if value == int(value):
+        value = int(value)
+    return f'{name} {value}'
+
+
+def render(values=None):
+    """Текст в формате Prometheus exposition 0.0.4."""
+    if values is None:
+        values = collect()
+    series = defaultdict(lambda: defaultdict(dict))
+    for (name, labels, le), value in values.items():
+        series[name][labels][le] = value
+    lines = []
+    for name, family in sorted(_families.items()):
+        lines.append(f'# HELP {name} {family.documentation}')
+        lines.append(f'# TYPE {name} {family.kind}')
+        for labels, samples in sorted(series.get(name, {}).items()):
+            if family.kind == 'counter':
+                lines.append(_sample(name, labels, samples['']))
+                continue
+            separator = ',' if labels else ''
+            count = 0
+            for le in family.bounds:
+                count += samples.get(le, 0)
+                lines.append(_sample(
+                    f'{name}_bucket', f'{labels}{separator}le="{le}"',
+                    count))
+            lines.append(_sample(f'{name}_sum', labels, samples.get('', 0)))
+            lines.append(_sample(f'{name}_count', labels, count))
+    return '\n'.join(lines) + '\n'
+
+
+@atexit.register
+def _flush_at_exit():
+    if _process.pid == os.getpid() and (_process.shards or _process.retired):
+        try:
+            flush()
+        except (sqlite3.Error, OSError):
+            pass
+
+
+REQUESTS = Counter(
+    'yatube_requests_total', 'Запросы по представлениям',
+    ('view', 'method', 'status'))
+REQUEST_SECONDS = Histogram(
+    'yatube_request_duration_seconds', 'Время обработки запроса',
+    ('view',), buckets=(
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+REQUEST_QUERIES = Histogram(
+    'yatube_request_queries', 'Число запросов к базе за запрос',
+    ('view',), buckets=(0, 1, 2, 5, 10, 20, 50, 100))
+CACHE_REQUESTS = Counter(
+    'yatube_cache_requests_total',
+    'Обращения к кэшу страниц, лент и фрагментов',
+    ('cache', 'result'))
+THUMBNAIL_SECONDS = Histogram(
+    'yatube_thumbnail_generation_seconds', 'Время создания миниатюр',
+    ('size',), buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+
+
+def cache_result(cache, hits, misses=0):
+    """Учесть попадания и промахи кэша ``cache``."""
+    if hits:
+        CACHE_REQUESTS.inc(cache, 'hit', amount=hits)
+    if misses:
+        CACHE_REQUESTS.inc(cache, 'miss', amount=misses)
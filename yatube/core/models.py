@@ -11,3 +11,75 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Task(models.Model):
+    """Отложенный вызов функции, который выполняет ``manage.py runworker``.
+
+    Выполненные задачи удаляются, в таблице остаются только ожидающие,
+    выполняющиеся и окончательно упавшие.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Ожидает'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        max_length=255,
+        verbose_name='Функция',
+        help_text='Полный путь к функции для import_string')
+    payload = models.TextField(
+        default='{}',
+        verbose_name='Аргументы',
+        help_text='Позиционные и именованные аргументы в JSON')
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING,
+        verbose_name='Состояние')
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток')
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Максимум попыток')
+    run_at = models.DateTimeField(
+        verbose_name='Выполнить не раньше')
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Занята до',
+        help_text='Если воркер не уложился, задачу заберет другой')
+    dedupe_key = models.CharField(
+        max_length=255,
+        null=True,
+        blank=True,
+        verbose_name='Ключ дедупликации',
+        help_text='Одновременно ожидать может только одна задача с ключом')
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка')
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создана')
+
+    class Meta:
+        ordering = ('run_at',)
+        indexes = (
+            models.Index(
+                fields=('status', 'run_at'), name='task_status_run_at_idx'),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('dedupe_key',),
+                condition=models.Q(status='pending'),
+                name='unique_pending_task'),
+        )
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
@@ -0,0 +1,182 @@
+import base64
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по паре (pub_date, id) без COUNT и OFFSET.
+
+    Каждая страница выбирается одним запросом
+    ``WHERE (pub_date, id) < (...) ORDER BY pub_date DESC, id DESC
+    LIMIT per_page + 1``, поэтому стоимость страницы N не зависит от N.
+    Переходы выполняются по непрозрачным токенам ``next_cursor`` и
+    ``previous_cursor``, последняя страница (``?page=last``) выбирается
+    тем же запросом в обратном порядке. Номер страницы (``?page=N``)
+    поддерживается только для старых ссылок: срез с OFFSET делается не
+    дальше ``max_offset_pages`` страниц.
+
+    Пагинатор создается на каждый запрос: ``count`` и ``num_pages``
+    описывают только уже известную часть ленты (до следующей страницы
+    включительно), поэтому стандартные методы ``Page`` работают как есть.
+    Если передан ``total`` (счетчик или закэшированная оценка), он
+    используется для номеров страниц в ``elided_page_range``.
+    """
+
+    ELLIPSIS = '…'
+    LAST = 'last'
+    date_field = 'pub_date'
+    id_field = 'id'
+    max_offset_pages = 10
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True, total=None):
+        object_list = object_list.order_by(
+            f'-{self.date_field}', f'-{self.id_field}')
+        super().__init__(
+            object_list, per_page, orphans, allow_empty_first_page)
+        self.total = total
+        self.count = 0
+        self.num_pages = 1
+        self.next_cursor = None
+        self.previous_cursor = None
+        self.elided_page_range = []
+        self.page_links = []
+
+    def encode_cursor(self, obj, number, forward):
+        key = getattr(obj, self.date_field).isoformat()
+        direction = 'n' if forward else 'p'
+        raw = f'{direction}|{number}|{key}|{getattr(obj, self.id_field)}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(cursor + padding).decode()
+            direction, number, key, pk = raw.split('|')
+            number, pk = int(number), int(pk)
+            key = parse_datetime(key)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            return None
+        if direction not in ('n', 'p') or key is None or number < 1:
+            return None
+        return direction == 'n', number, key, pk
+
+    def get_page(self, number=None, cursor=None):
+        """Вернуть страницу по токену, а при его отсутствии - по номеру.
+
+        Номер дальше ``max_offset_pages`` дает последнюю страницу, если
+        до нее дотягивает, и первую в остальных случаях.
+        """
+        decoded = self.decode_cursor(cursor) if cursor else None
+        if decoded is not None:
+            return self.cursor_page(*decoded)
+        if number == self.LAST:
+            return self.last_page()
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        if number > self.max_offset_pages:
+            if self.total and number >= self.last_number():
+                return self.last_page()
+            number = 1
+        return self.offset_page(number)
+
+    def last_number(self):
+        return max(-(-self.total // self.per_page), 1)
+
+    def last_page(self):
+        """Последняя страница по ``total`` без OFFSET.
+
+        Без ``total`` номер последней страницы неизвестен, и отдается
+        первая.
+        """
+        if not self.total:
+            return self.offset_page(1)
+        number = self.last_number()
+        size = self.total - (number - 1) * self.per_page
+        rows = list(self.object_list.reverse()[:size])
+        rows.reverse()
+        return self._make_page(rows, number, False)
+
+    def offset_page(self, number):
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return self._make_page(rows[:self.per_page], number, has_next)
+
+    def cursor_page(self, forward, number, key, pk):
+        date_field, id_field = self.date_field, self.id_field
+        if forward:
+            queryset = self.object_list.filter(
+                Q(**{f'{date_field}__lt': key})
+                | Q(**{date_field: key, f'{id_field}__lt': pk}))
+        else:
+            queryset = self.object_list.filter(
+                Q(**{f'{date_field}__gt': key})
+                | Q(**{date_field: key, f'{id_field}__gt': pk})
+            ).order_by(date_field, id_field)
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if forward:
+            return self._make_page(rows, number, more)
+        rows.reverse()
+        if not more:
+            number = 1
+        return self._make_page(rows, number, True)
+
+    def _make_page(self, rows, number, has_next):
+        self.num_pages = number + 1 if has_next else number
+        self.count = (
+            (number - 1) * self.per_page + len(rows) + int(has_next))
+        if self.total and has_next and self.total > self.count:
+            self.count = self.total
+            self.num_pages = -(-self.total // self.per_page)
+        if rows and has_next:
+            self.next_cursor = self.encode_cursor(
+                rows[-1], number + 1, forward=True)
+        if rows and number > 1:
+            self.previous_cursor = self.encode_cursor(
+                rows[0], number - 1, forward=False)
+        self.elided_page_range = list(self.get_elided_page_range(number))
+        self.page_links = list(self.get_page_links(number))
+        return Page(rows, number, self)
+
+    def get_elided_page_range(self, number):
+        """Первая, соседние с текущей и последняя страницы.
+
+        Это ровно те страницы, что выбираются без OFFSET; пропуски между
+        ними обозначаются ``ELLIPSIS``.
+        """
+        previous = 0
+        for page in sorted({1, number - 1, number, number + 1,
+                            self.num_pages}):
+            if not 1 <= page <= self.num_pages:
+                continue
+            if page > previous + 1:
+                yield self.ELLIPSIS
+            yield page
+            previous = page
+
+    def get_page_links(self, number):
+        """Пары (номер, query string) для навигации.
+
+        У текущей страницы, пропусков и страниц без токена query string -
+        ``None``.
+        """
+        for page in self.elided_page_range:
+            if page == number or page == self.ELLIPSIS:
+                query = None
+            elif page == 1:
+                query = ''
+            elif page == number - 1:
+                query = self.previous_cursor and (
+                    f'cursor={self.previous_cursor}')
+            elif page == number + 1:
+                query = self.next_cursor and f'cursor={self.next_cursor}'
+            else:
+                query = f'page={self.LAST}'
+            yield page, query
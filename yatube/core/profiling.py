@@ -0,0 +1,163 @@
+"""Профилирование отдельных запросов по требованию.
+
+Запрос профилируется, если в нем есть подписанный токен - в заголовке
+``X-Profile`` или в параметре ``?profile=`` (токен выдает
+``manage.py profiletoken``), - или если он попал в случайную выборку
+``PROFILE_SAMPLE_RATE``. В ``PROFILE_DIR`` тогда пишутся два файла с
+именем представления, числом запросов к базе и временем в имени:
+
+* ``.prof`` - результат ``cProfile`` для ``pstats``, snakeviz и т. п.;
+* ``.collapsed`` - стеки, снятые сэмплированием раз в
+  ``PROFILE_STACK_INTERVAL`` секунд, в формате ``flamegraph.pl``
+  (``a;b;c 12``).
+
+Профилирование включается только явно: по умолчанию ``PROFILE_DIR`` -
+``None``, и middleware отключается при старте (``MiddlewareNotUsed``).
+Включенное, оно без токена и выборки стоит проверки заголовка и строки
+запроса. По одному токену снимается не больше
+``PROFILE_TOKEN_MAX_DUMPS`` профилей, так что утекший токен не
+позволит завалить диск файлами.
+"""
+import cProfile
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+
+from core import timing
+
+HEADER = 'HTTP_X_PROFILE'
+PARAMETER = 'profile'
+SALT = 'core.profiling'
+TOKEN_VALUE = 'profile'
+DUMPS_KEY = 'profiling:dumps:{}'
+
+
+def make_token():
+    """Подписанный токен, включающий профилирование запроса."""
+    return signing.TimestampSigner(salt=SALT).sign(TOKEN_VALUE)
+
+
+def check_token(token):
+    try:
+        value = signing.TimestampSigner(salt=SALT).unsign(
+            token, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return value == TOKEN_VALUE
+
+
+def take_dump(token):
+    """Учесть профиль по токену; ``False``, если лимит токена исчерпан."""
+    key = DUMPS_KEY.format(token)
+    cache.add(key, 0, settings.PROFILE_TOKEN_MAX_AGE)
+    try:
+        dumps = cache.incr(key)
+    except ValueError:
+        # Счетчик вытеснен между add и incr.
+        cache.set(key, 1, settings.PROFILE_TOKEN_MAX_AGE)
+        dumps = 1
+    return dumps <= settings.PROFILE_TOKEN_MAX_DUMPS
+
+
+class StackSampler(threading.Thread):
+    """Снимает стек потока ``thread_id`` раз в ``interval`` секунд."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f'{frame.f_globals.get("__name__", "?")}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.done.set()
+        self.join()
+
+    def collapsed(self):
+        return ''.join(
+            f'{stack} {count}\n' for stack, count in self.stacks.items())
+
+
+def _slug(view_name):
+    return re.sub(r'[^\w.-]+', '_', view_name)
+
+
+class ProfilingMiddleware:
+    """Профилирует запросы с токеном и случайную долю остальных.
+
+    Стоит сразу после ``TimingMiddleware``, чтобы в имя файла попало
+    число запросов к базе.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILE_DIR:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        requested = self.requested(request)
+        if not requested and not self.sampled():
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        sampler = StackSampler(
+            threading.get_ident(), settings.PROFILE_STACK_INTERVAL)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            response = profiler.runcall(self.get_response, request)
+        finally:
+            sampler.stop()
+        elapsed = time.perf_counter() - started
+        name = self.save(request, profiler, sampler, elapsed)
+        if requested:
+            # Имя файла видит только тот, кто сам попросил профиль.
+            response['X-Profile-File'] = name
+        return response
+
+    def requested(self, request):
+        token = request.META.get(HEADER)
+        if not token and f'{PARAMETER}=' in request.META.get(
+                'QUERY_STRING', ''):
+            token = request.GET.get(PARAMETER)
+        return bool(token) and check_token(token) and take_dump(token)
+
+    def sampled(self):
+        rate = settings.PROFILE_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    def save(self, request, profiler, sampler, elapsed):
+        match = request.resolver_match
+        timings = timing.current()
+        name = '{}-{}-{}q-{}ms'.format(
+            datetime.now().strftime('%Y%m%d-%H%M%S-%f'),
+            _slug(match.view_name if match else request.path),
+            timings.queries if timings else 'n',
+            round(elapsed * 1000))
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        path = os.path.join(settings.PROFILE_DIR, name)
+        profiler.dump_stats(f'{path}.prof')
+        with open(f'{path}.collapsed', 'w') as output:
+            output.write(sampler.collapsed())
+        return name
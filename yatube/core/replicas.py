@@ -0,0 +1,208 @@
+"""Чтение с реплик базы данных с гарантией read-your-writes.
+
+Запросы на чтение из представлений, помеченных ``use_replica``, уходят
+на одну из реплик ``DATABASE_REPLICAS``; все остальное, включая любые
+записи, идет в ``default``. Пользователь, который только что что-то
+записал, получает cookie, и ``REPLICA_PIN_SECONDS`` секунд его чтения
+тоже идут в основную базу - так он сразу видит свои записи, даже если
+реплика отстает. Реплика, которая не отвечает или на которой упал
+запрос, исключается из ротации на ``REPLICA_HEALTH_INTERVAL`` секунд, а
+упавшее GET-представление выполняется заново в основной базе.
+
+Страница, прочитанная с реплики, может не содержать записи, которая уже
+увеличила версию кэша (``core.cache``). ``is_fresh`` говорит, успела ли
+реплика получить записи до заданного момента: ``syncreplicas`` отмечает
+в кэше время начала каждой копии. Для реплик без такой отметки ответ
+всегда отрицательный.
+
+Для SQLite реплики - копии файла основной базы, которые обновляет
+``manage.py syncreplicas``.
+"""
+import logging
+import random
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'replica_pin'
+SYNCED_KEY = 'replica-synced:{}'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_state = threading.local()
+_health = {}
+_health_lock = threading.Lock()
+
+
+def _check(alias):
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1 FROM django_migrations LIMIT 1')
+        return True
+    except DatabaseError:
+        connections[alias].close()
+        return False
+
+
+def is_healthy(alias):
+    """Результат последней проверки реплики, не старше интервала."""
+    now = time.monotonic()
+    healthy, checked = _health.get(alias, (None, 0))
+    if now - checked < settings.REPLICA_HEALTH_INTERVAL:
+        return healthy
+    with _health_lock:
+        _health[alias] = healthy, now
+    healthy = _check(alias)
+    with _health_lock:
+        _health[alias] = healthy, now
+    return healthy
+
+
+def mark_unhealthy(alias):
+    with _health_lock:
+        _health[alias] = False, time.monotonic()
+
+
+def mark_synced(alias, timestamp):
+    """Реплика содержит все записи, закоммиченные до ``timestamp``."""
+    cache.set(SYNCED_KEY.format(alias), timestamp, None)
+
+
+def is_fresh(since):
+    """Все реплики, прочитанные в текущем представлении, не старше ``since``.
+
+    Вне реплик (чтения из основной базы, ответ из кэша) - всегда да.
+    """
+    reads = getattr(_state, 'reads', None)
+    if not reads:
+        return True
+    synced = cache.get_many([SYNCED_KEY.format(alias) for alias in reads])
+    return len(synced) == len(reads) and min(synced.values()) >= since
+
+
+def guard_replica(execute, sql, params, many, context):
+    """Обертка ``execute_wrapper``: упавшая реплика выводится из ротации."""
+    try:
+        return execute(sql, params, many, context)
+    except DatabaseError:
+        alias = context['connection'].alias
+        if alias in settings.DATABASE_REPLICAS:
+            mark_unhealthy(alias)
+            failed = getattr(_state, 'failed', None)
+            if failed is not None:
+                failed.add(alias)
+        raise
+
+
+def install_replica_guard(sender, connection, **kwargs):
+    """Обработчик ``connection_created`` для всех баз, кроме основной."""
+    wrappers = connection.execute_wrappers
+    if connection.alias != DEFAULT_DB_ALIAS and guard_replica not in wrappers:
+        wrappers.append(guard_replica)
+
+
+def pin_to_primary():
+    """Читать из основной базы до конца запроса и немного после."""
+    _state.pinned = _state.wrote = True
+
+
+def use_replica(view):
+    """Разрешить представлению читать с реплик.
+
+    Если запрос к реплике упал, GET и HEAD выполняются еще раз целиком
+    в основной базе.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if hasattr(request, 'user'):
+            # Сессия и пользователь всегда читаются из основной базы:
+            # только что вошедший пользователь может быть еще не на реплике.
+            request.user.is_authenticated
+        previous = (getattr(_state, 'replica', False),
+                    getattr(_state, 'reads', None),
+                    getattr(_state, 'failed', None))
+        _state.replica, _state.reads, _state.failed = True, set(), set()
+        try:
+            try:
+                return view(request, *args, **kwargs)
+            except DatabaseError:
+                if not _state.failed or request.method not in SAFE_METHODS:
+                    raise
+                logger.warning(
+                    'Реплика %s недоступна, повтор в основной базе',
+                    ', '.join(sorted(_state.failed)), exc_info=True)
+            _state.replica, _state.reads = False, set()
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replica, _state.reads, _state.failed = previous
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not getattr(_state, 'replica', False):
+            return DEFAULT_DB_ALIAS
+        if getattr(_state, 'pinned', False):
+            return DEFAULT_DB_ALIAS
+        replicas = [
+            alias for alias in settings.DATABASE_REPLICAS
+            if is_healthy(alias)
+        ]
+        if not replicas:
+            return DEFAULT_DB_ALIAS
+        alias = random.choice(replicas)
+        _state.reads.add(alias)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaMiddleware:
+    """Закрепляет чтения за основной базой после записи пользователя."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        _state.pinned = pinned_until > time.time()
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            if _state.wrote:
+                seconds = settings.REPLICA_PIN_SECONDS
+                response.set_cookie(
+                    PIN_COOKIE, str(int(time.time()) + seconds),
+                    max_age=seconds, httponly=True)
+            return response
+        finally:
+            _state.pinned = _state.wrote = False
+
+
+def copy_database(source, target):
+    """Согласованная копия файла SQLite через backup API (в т.ч. в WAL)."""
+    source = sqlite3.connect(source)
+    target = sqlite3.connect(target)
+    try:
+        with target:
+            source.backup(target)
+    finally:
+        source.close()
+        target.close()
@@ -0,0 +1,93 @@
+"""Настройка соединений SQLite для конкурентной нагрузки.
+
+При открытии каждого соединения (сигнал ``connection_created``)
+применяются прагмы из ``SQLITE_PRAGMAS``: WAL позволяет читателям не
+ждать писателя, ``busy_timeout`` заставляет писателя подождать занятую
+базу вместо немедленной ошибки, ``mmap_size`` и ``cache_size`` уменьшают
+число системных вызовов при чтении.
+
+Там, где SQLite не ждет по ``busy_timeout`` (например, при повышении
+блокировки внутри транзакции), остается ``database is locked``. Такие
+запросы вне транзакций повторяются оберткой ``BusyRetry``, а целые
+транзакции - декоратором ``retry_on_busy``.
+"""
+import logging
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+logger = logging.getLogger(__name__)
+
+
+def is_busy(error):
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def apply_pragmas(db, pragmas):
+    """Выполнить ``PRAGMA name = value`` на соединении ``sqlite3``."""
+    for name, value in pragmas.items():
+        db.execute(f'PRAGMA {name} = {value}')
+
+
+def _delays():
+    delay = settings.SQLITE_BUSY_RETRY_DELAY
+    for attempt in range(settings.SQLITE_BUSY_RETRIES):
+        yield delay * 2 ** attempt
+
+
+class BusyRetry:
+    """Обертка ``execute_wrapper``: повтор занятого запроса вне транзакции.
+
+    Внутри ``atomic`` повтор одного запроса нарушил бы транзакцию, поэтому
+    там ошибка пробрасывается - повторять надо всю транзакцию целиком.
+    """
+
+    def __call__(self, execute, sql, params, many, context):
+        connection = context['connection']
+        for delay in _delays():
+            try:
+                return execute(sql, params, many, context)
+            except OperationalError as error:
+                if not is_busy(error) or connection.in_atomic_block:
+                    raise
+                logger.warning('База занята, повтор через %.2f с', delay)
+                time.sleep(delay)
+        return execute(sql, params, many, context)
+
+
+busy_retry = BusyRetry()
+
+
+def retry_on_busy(func=None, *, using=None):
+    """Повторить всю функцию, если база была занята.
+
+    Функция должна сама открывать транзакцию; если она вызвана внутри
+    внешней ``atomic``, повтора нет - ошибку обработает внешний уровень.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            connection = connections[using or DEFAULT_DB_ALIAS]
+            for delay in _delays():
+                try:
+                    return func(*args, **kwargs)
+                except OperationalError as error:
+                    if not is_busy(error) or connection.in_atomic_block:
+                        raise
+                    time.sleep(delay)
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator(func) if func else decorator
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Обработчик ``connection_created``: прагмы и повтор запросов."""
+    if connection.vendor != 'sqlite':
+        return
+    # Прямо через sqlite3: прагмы не должны попадать в журнал запросов.
+    apply_pragmas(connection.connection, settings.SQLITE_PRAGMAS)
+    if busy_retry not in connection.execute_wrappers:
+        connection.execute_wrappers.append(busy_retry)
@@ -0,0 +1,167 @@
+"""Статистика SQL по отпечаткам запросов и журнал медленных запросов.
+
+Обертка ``execute_wrapper`` ``collect_query`` (ее ставит на каждое
+соединение ``install_collector``) приводит SQL к отпечатку: литералы и
+параметры заменяются на ``?``, списки ``IN (...)`` и ``VALUES``
+сворачиваются, поэтому запросы одной формы попадают в одну строку.
+Время запроса копится в гистограмме ``core.metrics`` с метками
+представления и короткого хэша отпечатка, а сам текст отпечатка один раз
+на процесс записывается рядом, в файл метрик. Оттуда итоги по всем
+процессам читает ``manage.py sqlreport``; p99 оценивается по корзинам
+гистограммы.
+
+Запрос дольше ``SLOW_QUERY_THRESHOLD`` секунд пишется в журнал
+``core.sqlstats`` вместе с местом в коде проекта, откуда он выполнен.
+"""
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import traceback
+from functools import lru_cache
+from time import perf_counter
+
+from django.conf import settings
+
+from core import metrics, timing
+
+logger = logging.getLogger(__name__)
+
+QUERY_SECONDS = metrics.Histogram(
+    'yatube_sql_duration_seconds',
+    'Время SQL-запросов по представлениям и отпечаткам',
+    ('view', 'fingerprint'), buckets=(
+        0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+        1, 2.5))
+
+SCHEMA = '''CREATE TABLE IF NOT EXISTS sql_fingerprints (
+    fingerprint TEXT PRIMARY KEY,
+    sql TEXT NOT NULL
+) WITHOUT ROWID'''
+
+NORMALIZERS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'%s|\?|\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\bIN \((?:\?, )*\?\)', re.IGNORECASE), 'IN (...)'),
+    (re.compile(r'\bVALUES (?:\((?:\?, )*\?\),? ?)+', re.IGNORECASE),
+     'VALUES (...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+# Кадры самого сбора статистики не считаются источником запроса.
+OWN_FILES = ('sqlstats.py', 'timing.py', 'sqlite.py', 'metrics.py')
+
+_seen = set()
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Вернуть пару (хэш, нормализованный SQL)."""
+    for pattern, replacement in NORMALIZERS:
+        sql = pattern.sub(replacement, sql)
+    sql = sql.strip()
+    return hashlib.md5(sql.encode()).hexdigest()[:12], sql
+
+
+def _remember(digest, sql):
+    # Текст отпечатка нужен только отчету; пишется один раз на процесс.
+    key = settings.METRICS_PATH, digest
+    if key in _seen:
+        return
+    db = metrics.connect()
+    db.execute(SCHEMA)
+    db.execute(
+        'INSERT OR IGNORE INTO sql_fingerprints VALUES (?, ?)',
+        (digest, sql))
+    _seen.add(key)
+
+
+def origin():
+    """Кадры стека из кода проекта, от внешнего к внутреннему."""
+    base = str(settings.BASE_DIR) + os.sep
+    return [
+        f'{os.path.relpath(frame.filename, base)}:{frame.lineno} '
+        f'{frame.name}'
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(base)
+        and os.path.basename(frame.filename) not in OWN_FILES
+    ]
+
+
+def collect_query(execute, sql, params, many, context):
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = perf_counter() - started
+        digest, normalized = fingerprint(sql)
+        view = timing.view_name()
+        QUERY_SECONDS.observe(elapsed, view, digest)
+        try:
+            _remember(digest, normalized)
+        except sqlite3.Error:
+            logger.warning('Не удалось сохранить отпечаток', exc_info=True)
+        if elapsed >= settings.SLOW_QUERY_THRESHOLD:
+            stack = origin()
+            logger.warning(
+                'Медленный запрос %.1f мс, %s, %s: %s',
+                elapsed * 1000, view, stack[-1] if stack else '-', sql,
+                extra={'view_name': view, 'stack': stack,
+                       'fingerprint': digest})
+
+
+def install_collector(sender, connection, **kwargs):
+    """Обработчик ``connection_created``: сбор статистики SQL."""
+    wrappers = connection.execute_wrappers
+    if settings.SQL_STATS and collect_query not in wrappers:
+        wrappers.append(collect_query)
+
+
+def quantile(bounds, counts, fraction):
+    """Верхняя граница корзины, в которую попадает доля ``fraction``.
+
+    Для значений выше последней границы возвращается ``None``.
+    """
+    total = sum(counts)
+    if not total:
+        return 0
+    seen = 0
+    for bound, count in zip(bounds, counts):
+        seen += count
+        if seen >= total * fraction:
+            return bound if bound != float('inf') else None
+    return None
+
+
+def report(by_view=False):
+    """Итоги по отпечаткам (или парам представление-отпечаток).
+
+    Возвращает словари с ключами ``fingerprint``, ``view``, ``sql``,
+    ``count``, ``total`` (секунды) и ``p99`` (секунды, по корзинам).
+    """
+    buckets = [float(bound) for bound in QUERY_SECONDS.buckets]
+    bounds = [*buckets, float('inf')]
+    index = {le: number for number, le in enumerate(QUERY_SECONDS.bounds)}
+    rows = {}
+    for (name, labels, le), value in metrics.collect().items():
+        if name != QUERY_SECONDS.name:
+            continue
+        view, digest = re.fullmatch(
+            r'view="(.*)",fingerprint="(\w+)"', labels).groups()
+        key = (view if by_view else None, digest)
+        row = rows.setdefault(key, {
+            'fingerprint': digest, 'view': key[0], 'count': 0,
+            'total': 0.0, 'buckets': [0] * len(bounds)})
+        if le:
+            row['count'] += int(value)
+            row['buckets'][index[le]] += value
+        else:
+            row['total'] += value
+    db = metrics.connect()
+    db.execute(SCHEMA)
+    texts = dict(db.execute('SELECT fingerprint, sql FROM sql_fingerprints'))
+    for row in rows.values():
+        row['sql'] = texts.get(row['fingerprint'], '')
+        row['p99'] = quantile(bounds, row.pop('buckets'), 0.99)
+    return list(rows.values())
@@ -0,0 +1,110 @@
+"""Прогрев воркера при импорте ``yatube.wsgi``.
+
+Без прогрева первый запрос к каждому воркеру разбирает все URLconf и
+компилирует шаблоны страницы. ``warm`` делает это заранее: заполняет
+обратные словари всех резолверов и загружает все шаблоны проекта и
+приложений в кэширующий загрузчик (в ``yatube.settings.prod``). С
+``--preload`` у gunicorn прогретое состояние достается воркерам через
+fork.
+
+Разбор вывода ``python -X importtime`` для ``manage.py startupbench``
+тоже здесь.
+"""
+import logging
+import os
+from collections import defaultdict
+
+from django.template import TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+from django.urls import URLResolver, get_resolver
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt', '.xml')
+
+
+def warm_resolvers(resolver=None):
+    """Заполнить словари резолвера и всех вложенных; вернуть их число."""
+    resolver = resolver or get_resolver()
+    # Доступ к reverse_dict заполняет словари для текущего языка.
+    resolver.reverse_dict
+    count = 1
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            count += warm_resolvers(pattern)
+    return count
+
+
+def template_names(directories):
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(TEMPLATE_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, directory).replace(
+                        os.sep, '/')
+
+
+def warm_templates():
+    """Загрузить все шаблоны; вернуть число загруженных."""
+    count = 0
+    for engine in engines.all():
+        directories = [
+            *getattr(engine, 'dirs', []),
+            *get_app_template_dirs('templates'),
+        ]
+        for name in set(template_names(directories)):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError:
+                # Шаблоны неустановленных приложений или тегов, которые
+                # в этом профиле не нужны.
+                logger.debug('Шаблон %s пропущен при прогреве', name)
+            else:
+                count += 1
+    return count
+
+
+def warm():
+    resolvers = warm_resolvers()
+    templates = warm_templates()
+    logger.info(
+        'Прогрев: резолверов %d, шаблонов %d', resolvers, templates)
+    return resolvers, templates
+
+
+def app_module(app):
+    """``posts.apps.PostsConfig`` -> ``posts``."""
+    parts = app.split('.')
+    if len(parts) > 2 and parts[-2] == 'apps' and parts[-1].endswith(
+            'Config'):
+        return '.'.join(parts[:-2])
+    return app
+
+
+def parse_importtime(output):
+    """Собственное время импорта модулей, в микросекундах."""
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, _, module = line[len('import time:'):].split('|')
+        times[module.strip()] = int(own)
+    return times
+
+
+def group_by_app(times, apps):
+    """Время импорта по приложениям, остальное - по пакетам верхнего уровня.
+
+    Модуль относится к приложению с самым длинным совпадающим префиксом.
+    """
+    modules = sorted(map(app_module, apps), key=len, reverse=True)
+    groups = defaultdict(int)
+    for module, own in times.items():
+        for app in modules:
+            if module == app or module.startswith(app + '.'):
+                groups[app] += own
+                break
+        else:
+            groups[module.split('.')[0]] += own
+    return groups
@@ -0,0 +1,149 @@
+"""Очередь фоновых задач в базе данных.
+
+``enqueue`` записывает вызов функции в таблицу ``core_task`` в текущей
+транзакции, поэтому воркер увидит задачу только после фиксации данных,
+ради которых она поставлена. Задачи выполняет ``manage.py runworker``;
+упавшая задача повторяется с экспоненциальной задержкой, пока не
+кончатся попытки. Задача с ``dedupe_key`` не ставится повторно, пока
+такая же еще ожидает выполнения.
+
+Все работает поверх ORM и не требует внешних сервисов, в том числе на
+SQLite.
+"""
+import json
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import Task
+
+logger = logging.getLogger(__name__)
+
+# Сколько кандидатов брать за раз: при гонке воркеров кто-то из них
+# почти наверняка достанется этому.
+CLAIM_BATCH = 10
+
+
+def task_name(func):
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, *args, dedupe_key=None, delay=0, max_attempts=None,
+            **kwargs):
+    """Поставить ``func(*args, **kwargs)`` в очередь.
+
+    Аргументы должны сериализоваться в JSON. Возвращает задачу или
+    ``None``, если задача с тем же ``dedupe_key`` уже ожидает.
+    """
+    task = Task(
+        name=task_name(func),
+        payload=json.dumps({'args': args, 'kwargs': kwargs}),
+        max_attempts=max_attempts or settings.TASK_MAX_ATTEMPTS,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        dedupe_key=dedupe_key,
+    )
+    if dedupe_key is None:
+        task.save()
+        return task
+    try:
+        with transaction.atomic():
+            task.save()
+    except IntegrityError:
+        return None
+    return task
+
+
+def backoff(attempt):
+    """Задержка перед повтором: растет вдвое, со случайным разбросом."""
+    delay = min(
+        settings.TASK_RETRY_DELAY * 2 ** (attempt - 1),
+        settings.TASK_RETRY_MAX_DELAY)
+    return delay * random.uniform(0.5, 1)
+
+
+class Worker:
+    def __init__(self, poll_interval=1.0):
+        self.poll_interval = poll_interval
+
+    @staticmethod
+    def _available(now):
+        return (
+            Q(status=Task.PENDING, run_at__lte=now)
+            | Q(status=Task.RUNNING, locked_until__lt=now))
+
+    def claim(self):
+        """Атомарно занять одну готовую задачу или вернуть ``None``.
+
+        Занятие - условный ``UPDATE`` по id: из нескольких воркеров его
+        выполнит только один, блокировки строк не нужны.
+        """
+        now = timezone.now()
+        available = self._available(now)
+        candidates = Task.objects.filter(available).order_by(
+            'run_at').values_list('pk', flat=True)[:CLAIM_BATCH]
+        for pk in candidates:
+            claimed = Task.objects.filter(available, pk=pk).update(
+                status=Task.RUNNING,
+                attempts=F('attempts') + 1,
+                locked_until=now + timedelta(seconds=settings.TASK_LEASE))
+            if claimed:
+                return Task.objects.get(pk=pk)
+        return None
+
+    def execute(self, task):
+        try:
+            func = import_string(task.name)
+            payload = json.loads(task.payload)
+            func(*payload['args'], **payload['kwargs'])
+        except Exception:
+            logger.exception('Задача %s упала', task)
+            self.fail(task, traceback.format_exc())
+        else:
+            task.delete()
+
+    def fail(self, task, error):
+        task.last_error = error
+        task.locked_until = None
+        if task.attempts >= task.max_attempts:
+            task.status = Task.FAILED
+            task.save()
+            return
+        task.status = Task.PENDING
+        task.run_at = timezone.now() + timedelta(
+            seconds=backoff(task.attempts))
+        try:
+            with transaction.atomic():
+                task.save()
+        except IntegrityError:
+            # Пока задача выполнялась, поставили такую же - повтор не нужен.
+            task.delete()
+
+    def run_once(self):
+        """Выполнить одну задачу; ``False``, если выполнять нечего."""
+        try:
+            task = self.claim()
+        except OperationalError:
+            logger.warning('Не удалось занять задачу', exc_info=True)
+            return False
+        if task is None:
+            return False
+        self.execute(task)
+        return True
+
+    def run(self, stop, burst=False):
+        """Выполнять задачи, пока не выставлен ``stop``.
+
+        С ``burst`` воркер завершается, как только очередь опустела.
+        """
+        while not stop.is_set():
+            if not self.run_once():
+                if burst:
+                    return
+                stop.wait(self.poll_interval)
@@ -0,0 +1,28 @@
+"""Шаблонный бэкенд Django с замером времени рендеринга.
+
+Отличается от стандартного только тем, что ``render`` учитывается в
+составляющей ``tpl`` замеров запроса (см. ``core.timing``). Подключение::
+
+    TEMPLATES = [{'BACKEND': 'core.template_backends.DjangoTemplates', ...}]
+"""
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as backend
+
+from core.timing import span
+
+
+class Template(backend.Template):
+    def render(self, context=None, request=None):
+        with span('tpl'):
+            return super().render(context, request)
+
+
+class DjangoTemplates(backend.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            backend.reraise(exc, self)
@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from core import metrics
+
+
+class QueryBudgetMixin:
+    """Проверка, что страница укладывается в бюджет SQL-запросов.
+
+    Бюджеты задаются в ``query_budgets`` как ``{'posts:index': 3}``;
+    любая страница, превысившая свой бюджет, роняет тест со списком
+    выполненных запросов.
+    """
+
+    query_budgets = {}
+
+    def assertQueryBudget(self, client, url_name, *args, **kwargs):
+        budget = self.query_budgets[url_name]
+        url = reverse(url_name, args=args, kwargs=kwargs)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        queries = [query['sql'] for query in context.captured_queries]
+        self.assertLessEqual(
+            len(queries), budget,
+            f'{url_name} ({url}) выполнила {len(queries)} запросов '
+            f'при бюджете {budget}:\n' + '\n'.join(queries))
+        return response
+
+
+class OnCommitMixin:
+    """``captureOnCommitCallbacks`` из Django 3.2 для ``TestCase``.
+
+    ``TestCase`` выполняет тест в транзакции, которая откатывается, и
+    колбэки ``transaction.on_commit`` (например, смена версий кэша) сами
+    не вызываются. С ``execute=True`` колбэки, поставленные внутри блока,
+    выполняются при выходе из него.
+    """
+
+    @classmethod
+    @contextmanager
+    def captureOnCommitCallbacks(cls, *, using=DEFAULT_DB_ALIAS,
+                                 execute=False):
+        callbacks = []
+        start = len(connections[using].run_on_commit)
+        try:
+            yield callbacks
+        finally:
+            callbacks[:] = [
+                func for _, func in connections[using].run_on_commit[start:]]
+            if execute:
+                for callback in callbacks:
+                    callback()
+
+
+@contextmanager
+def isolated_files():
+    """Направить файлы, общие для процессов проекта, во временный каталог.
+
+    Тесты не должны писать метрики в файл, который читает продакшен, и
+    не должны очищать или наполнять рабочий кэш ``SQLiteCache``.
+    Несброшенные итоги тестов забываются при выходе.
+    """
+    directory = tempfile.mkdtemp(prefix='yatube-tests-')
+    caches = {
+        alias: {**options, 'LOCATION': os.path.join(
+            directory, f'cache-{alias}.sqlite3')}
+        if options['BACKEND'] == 'core.cache_backends.SQLiteCache'
+        else options
+        for alias, options in settings.CACHES.items()
+    }
+    try:
+        with override_settings(
+                METRICS_PATH=os.path.join(directory, 'metrics.sqlite3'),
+                CACHES=caches):
+            yield directory
+            metrics.reset()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class TestRunner(DiscoverRunner):
+    """``DiscoverRunner`` с ``isolated_files`` на весь прогон."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.files = ExitStack()
+        self.files.enter_context(isolated_files())
+
+    def teardown_test_environment(self, **kwargs):
+        self.files.close()
+        super().teardown_test_environment(**kwargs)
@@ -1,9 +1,748 @@
-from django.test import TestCase
+import json
+import multiprocessing
+import os
+import pstats
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from email.mime.text import MIMEText
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.test import (
+    LiveServerTestCase, SimpleTestCase, TestCase, TransactionTestCase,
+    override_settings)
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 from http import HTTPStatus
 
+from core import metrics, profiling, replicas, sqlstats, startup, timing
+from core.cache_backends import SQLiteCache
+from core.mail import QueuedEmailBackend
+from core.sqlite import busy_retry, retry_on_busy
+from core.models import Task
+from core.tasks import Worker, enqueue
+from posts.models import Group, Post
+
+User = get_user_model()
+
+CALLS = []
+
+
+def record(*args, **kwargs):
+    CALLS.append((args, kwargs))
+
+
+def explode():
+    raise RuntimeError('Сбой')
+
 
 class ViewTestClass(TestCase):
     def test_error_page(self):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class SQLiteCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_values_are_shared_between_instances(self):
+        self.cache.set('page', {'html': '<p>Пост</p>'})
+        other = self.make_cache()
+        self.assertEqual(other.get('page'), {'html': '<p>Пост</p>'})
+        other.delete('page')
+        self.assertIsNone(self.cache.get('page'))
+
+    def test_incr_is_atomic(self):
+        self.cache.set('counter', 0)
+        caches = [self.make_cache() for _ in range(4)]
+
+        def work(cache):
+            for _ in range(50):
+                cache.incr('counter')
+
+        threads = [
+            threading.Thread(target=work, args=(cache,)) for cache in caches]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_expired_values_are_missing(self):
+        self.cache.set('short', 1, timeout=-1)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertTrue(self.cache.add('short', 2))
+        self.assertFalse(self.cache.add('short', 3))
+        self.assertEqual(self.cache.get('short'), 2)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = self.make_cache(MAX_ENTRIES=4, CULL_FREQUENCY=2)
+        cache.access_resolution = 0
+        for i in range(4):
+            cache.set(f'key{i}', i)
+        cache.get('key0')
+        cache.set('key4', 4)
+        self.assertEqual(
+            cache.get_many([f'key{i}' for i in range(5)]),
+            {'key0': 0, 'key4': 4})
+
+    def test_size_is_capped(self):
+        cache = self.make_cache(MAX_SIZE=10000)
+        for i in range(20):
+            cache.set(f'key{i}', 'x' * 1000)
+        self.assertLessEqual(
+            cache._db.execute('SELECT size FROM cache_stats').fetchone()[0],
+            10000)
+        self.assertIsNotNone(cache.get('key19'))
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+        self.worker = Worker()
+
+    def drain(self):
+        self.worker.run(threading.Event(), burst=True)
+
+    def test_task_runs_and_is_removed(self):
+        enqueue(record, 1, 'два', flag=True)
+        self.drain()
+        self.assertEqual(CALLS, [((1, 'два'), {'flag': True})])
+        self.assertFalse(Task.objects.exists())
+
+    def test_delayed_task_waits(self):
+        enqueue(record, delay=60)
+        self.drain()
+        self.assertEqual(CALLS, [])
+
+    def test_pending_duplicates_are_dropped(self):
+        self.assertIsNotNone(enqueue(record, 1, dedupe_key='same'))
+        self.assertIsNone(enqueue(record, 2, dedupe_key='same'))
+        self.drain()
+        self.assertEqual(CALLS, [((1,), {})])
+        self.assertIsNotNone(enqueue(record, 3, dedupe_key='same'))
+
+    @override_settings(TASK_RETRY_DELAY=10)
+    def test_failed_task_is_retried_with_backoff(self):
+        task = enqueue(explode, max_attempts=2)
+        self.drain()
+        task.refresh_from_db()
+        self.assertEqual(
+            (task.status, task.attempts), (Task.PENDING, 1))
+        self.assertIn('RuntimeError', task.last_error)
+        self.assertGreater(
+            task.run_at, timezone.now() + timedelta(seconds=4))
+        Task.objects.filter(pk=task.pk).update(run_at=timezone.now())
+        self.drain()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+
+    def test_expired_lease_is_reclaimed(self):
+        task = enqueue(record, 'снова')
+        self.assertEqual(self.worker.claim(), task)
+        self.assertIsNone(Worker().claim())
+        Task.objects.filter(pk=task.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1))
+        self.drain()
+        self.assertEqual(CALLS, [(('снова',), {})])
+
+    def test_queued_email_is_sent_by_worker(self):
+        QueuedEmailBackend().send_messages([mail.EmailMessage(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com'])])
+        self.assertEqual(mail.outbox, [])
+        with override_settings(QUEUED_EMAIL_BACKEND=(
+                'django.core.mail.backends.locmem.EmailBackend')):
+            self.drain()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Тема')
+
+    def test_queued_email_keeps_attachments(self):
+        email = mail.EmailMessage(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com'])
+        email.attach('note.txt', 'Заметка', 'text/plain')
+        email.attach('image.png', b'\x89PNG\x00', 'image/png')
+        QueuedEmailBackend().send_messages([email])
+        with override_settings(QUEUED_EMAIL_BACKEND=(
+                'django.core.mail.backends.locmem.EmailBackend')):
+            self.drain()
+        self.assertEqual(mail.outbox[0].attachments, [
+            ('note.txt', 'Заметка', 'text/plain'),
+            ('image.png', b'\x89PNG\x00', 'image/png'),
+        ])
+
+    @override_settings(QUEUED_EMAIL_BACKEND=(
+        'django.core.mail.backends.locmem.EmailBackend'))
+    def test_email_with_mime_attachment_is_sent_at_once(self):
+        email = mail.EmailMessage(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com'])
+        email.attach(MIMEText('Часть'))
+        self.assertEqual(QueuedEmailBackend().send_messages([email]), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(Task.objects.exists())
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        # Записи вне запроса (фикстуры других тестов) закрепляют поток за
+        # основной базой до конца его жизни.
+        replicas._state.__dict__.clear()
+        replicas._health['replica'] = True, time.monotonic()
+        self.router = replicas.ReplicaRouter()
+        self.request = RequestFactory().get('/')
+
+    def tearDown(self):
+        replicas._health.clear()
+
+    def read_in_view(self, write=False):
+        def view(request):
+            if write:
+                self.router.db_for_write(Task)
+            return self.router.db_for_read(Task)
+        return replicas.use_replica(view)(self.request)
+
+    def test_only_marked_views_read_from_replica(self):
+        self.assertEqual(self.read_in_view(), 'replica')
+        self.assertEqual(self.router.db_for_read(Task), 'default')
+        self.assertEqual(self.router.db_for_write(Task), 'default')
+
+    def test_reads_after_write_stay_on_primary(self):
+        self.assertEqual(self.read_in_view(write=True), 'default')
+
+    def test_unhealthy_replica_is_skipped(self):
+        replicas.mark_unhealthy('replica')
+        self.assertEqual(self.read_in_view(), 'default')
+
+    def test_copy_database(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        source = os.path.join(directory, 'primary.sqlite3')
+        target = os.path.join(directory, 'replica.sqlite3')
+        with sqlite3.connect(source) as db:
+            db.execute('PRAGMA journal_mode = WAL')
+            db.execute('CREATE TABLE post (text TEXT)')
+            db.execute("INSERT INTO post VALUES ('Тестовый пост')")
+        replicas.copy_database(source, target)
+        with sqlite3.connect(target) as db:
+            self.assertEqual(
+                db.execute('SELECT text FROM post').fetchall(),
+                [('Тестовый пост',)])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaStickinessTests(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        replicas._health.clear()
+        self.user = get_user_model().objects.create_user(username='test')
+        self.post = Post.objects.create(author=self.user, text='Пост')
+        self.client.force_login(self.user)
+        self.url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id})
+
+    def tearDown(self):
+        replicas._health.clear()
+
+    def replica_queries(self):
+        with CaptureQueriesContext(connections['replica']) as queries:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        return len(queries)
+
+    def test_reads_go_to_primary_after_own_write(self):
+        self.assertGreater(self.replica_queries(), 0)
+        response = self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            {'text': 'Комментарий'})
+        self.assertIn(replicas.PIN_COOKIE, response.cookies)
+        self.assertEqual(self.replica_queries(), 0)
+        self.client.cookies[replicas.PIN_COOKIE] = '0'
+        self.assertGreater(self.replica_queries(), 0)
+
+    def test_failed_replica_read_is_retried_on_primary(self):
+        def fail(execute, sql, params, many, context):
+            raise OperationalError('disk I/O error')
+
+        connections['replica'].ensure_connection()
+        replicas._health['replica'] = True, time.monotonic()
+        with self.assertLogs('core.replicas', 'WARNING'):
+            with connections['replica'].execute_wrapper(fail):
+                response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Пост')
+        self.assertFalse(replicas.is_healthy('replica'))
+        self.assertEqual(self.replica_queries(), 0)
+
+    def test_pages_from_stale_replica_are_not_cached(self):
+        cache.clear()
+        self.client.logout()
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(author=self.user, group=group, text='В группе')
+        url = reverse('posts:group_list', kwargs={'slug': 'group'})
+        for _ in range(2):
+            with CaptureQueriesContext(connections['replica']) as queries:
+                response = self.client.get(url)
+            self.assertGreater(len(queries), 0)
+            self.assertFalse(response.has_header('ETag'))
+        replicas.mark_synced('replica', time.time())
+        self.client.get(url)
+        with CaptureQueriesContext(connections['replica']) as queries:
+            response = self.client.get(url)
+        self.assertEqual(len(queries), 0)
+        self.assertTrue(response.has_header('ETag'))
+
+
+class SQLiteTuningTests(TestCase):
+    def test_pragmas_and_retry_are_installed(self):
+        connection.ensure_connection()
+        busy_timeout = connection.connection.execute(
+            'PRAGMA busy_timeout').fetchone()[0]
+        self.assertEqual(busy_timeout, 5000)
+        self.assertIn(busy_retry, connection.execute_wrappers)
+
+
+@override_settings(SQLITE_BUSY_RETRIES=3, SQLITE_BUSY_RETRY_DELAY=0)
+class BusyRetryTests(SimpleTestCase):
+    class Connection:
+        in_atomic_block = False
+
+    def flaky(self, failures):
+        calls = []
+
+        def execute(*args):
+            calls.append(args)
+            if len(calls) <= failures:
+                raise OperationalError('database is locked')
+            return 'ok'
+        return execute, calls
+
+    def test_busy_statement_is_retried(self):
+        execute, calls = self.flaky(2)
+        context = {'connection': self.Connection()}
+        self.assertEqual(
+            busy_retry(execute, 'SELECT 1', None, False, context), 'ok')
+        self.assertEqual(len(calls), 3)
+
+    def test_statement_in_transaction_is_not_retried(self):
+        execute, calls = self.flaky(1)
+        context = {'connection': self.Connection()}
+        context['connection'].in_atomic_block = True
+        with self.assertRaises(OperationalError):
+            busy_retry(execute, 'SELECT 1', None, False, context)
+        self.assertEqual(len(calls), 1)
+
+    def test_transaction_is_retried_until_attempts_run_out(self):
+        execute, calls = self.flaky(10)
+        with self.assertRaises(OperationalError):
+            retry_on_busy(execute)()
+        self.assertEqual(len(calls), 4)
+        execute, calls = self.flaky(1)
+        self.assertEqual(retry_on_busy(execute)(), 'ok')
+
+
+class TimingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='timing')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('posts:index'))
+        header = response['Server-Timing']
+        for name in ('db;dur=', 'tpl;dur=', 'total;dur='):
+            self.assertIn(name, header)
+        self.assertIn(f'desc="{len(captured)} queries"', header)
+
+    def test_log_line_is_keyed_by_view_name(self):
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+        self.assertIn('view=posts:index', logs.output[0])
+        self.assertIn('status=200', logs.output[0])
+        record = logs.records[0]
+        self.assertEqual(record.view_name, 'posts:index')
+        self.assertIn('total_ms', record.timings)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_header_can_be_disabled(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_nested_spans_are_counted_once(self):
+        timings = timing.RequestTimings()
+        timing._state.timings = timings
+        try:
+            with timing.span('tpl'):
+                with timing.span('tpl'):
+                    time.sleep(0.01)
+        finally:
+            timing._state.timings = None
+        self.assertGreaterEqual(timings.spans['tpl'], 0.01)
+        self.assertLess(timings.spans['tpl'], 0.02)
+        with timing.span('tpl'):
+            pass
+
+
+def record_in_child():
+    metrics.REQUESTS.inc('child', 'GET', 200)
+    metrics.flush()
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.settings = override_settings(
+            METRICS_PATH=os.path.join(cls.directory, 'metrics.sqlite3'))
+        cls.settings.enable()
+        user = User.objects.create_user(username='metrics')
+        Post.objects.create(author=user, text='Тестовый пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        samples = {}
+        for line in response.content.decode().splitlines():
+            if not line.startswith('#'):
+                name, value = line.rsplit(' ', 1)
+                samples[name] = float(value)
+        return samples
+
+    def delta(self, before, after, name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    def test_requests_and_cache_results_are_counted(self):
+        before = self.scrape()
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        after = self.scrape()
+        view = 'view="posts:index"'
+        for name, expected in (
+            ('yatube_requests_total{%s,method="GET",status="200"}' % view,
+             2),
+            ('yatube_request_duration_seconds_count{%s}' % view, 2),
+            ('yatube_request_queries_count{%s}' % view, 2),
+            ('yatube_cache_requests_total{cache="page",result="miss"}', 1),
+            ('yatube_cache_requests_total{cache="page",result="hit"}', 1),
+            ('yatube_cache_requests_total{cache="fragment",result="miss"}',
+             1),
+        ):
+            with self.subTest(name=name):
+                self.assertEqual(self.delta(before, after, name), expected)
+        inf = 'yatube_request_duration_seconds_bucket{%s,le="+Inf"}' % view
+        self.assertEqual(self.delta(before, after, inf), 2)
+
+    def test_totals_of_finished_processes_are_kept(self):
+        name = 'yatube_requests_total{view="child",method="GET",status="200"}'
+        before = self.scrape().get(name, 0)
+        child = multiprocessing.get_context('fork').Process(
+            target=record_in_child)
+        child.start()
+        child.join()
+        self.assertEqual(self.scrape()[name], before + 1)
+        processes = sqlite3.connect(settings.METRICS_PATH).execute(
+            'SELECT COUNT(DISTINCT process) FROM metrics').fetchone()[0]
+        self.assertEqual(processes, 2)
+
+    def test_finished_threads_are_folded_into_process(self):
+        name = 'yatube_requests_total{view="thread",method="GET",status="200"}'
+        before = self.scrape().get(name, 0)
+        shards = len(metrics._current().shards)
+        threads = [
+            threading.Thread(
+                target=metrics.REQUESTS.inc, args=('thread', 'GET', 200))
+            for _ in range(50)
+        ]
+        for thread in threads:
+            thread.start()
+            thread.join()
+        del thread, threads
+        self.assertLessEqual(len(metrics._current().shards), shards)
+        self.assertEqual(self.scrape()[name], before + 50)
+
+    def test_histogram_buckets_are_cumulative(self):
+        key = metrics.THUMBNAIL_SECONDS.name
+        text = metrics.render({
+            (key, 'size="card"', '0.05'): 2,
+            (key, 'size="card"', '1'): 1,
+            (key, 'size="card"', ''): 0.6,
+        })
+        self.assertIn(f'{key}_bucket{{size="card",le="0.01"}} 0', text)
+        self.assertIn(f'{key}_bucket{{size="card",le="0.5"}} 2', text)
+        self.assertIn(f'{key}_bucket{{size="card",le="+Inf"}} 3', text)
+        self.assertIn(f'{key}_count{{size="card"}} 3', text)
+
+    def test_endpoint_is_private(self):
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='203.0.113.1')
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+
+class TestRunnerTests(SimpleTestCase):
+    def test_metrics_are_written_outside_project(self):
+        self.assertFalse(
+            settings.METRICS_PATH.startswith(str(settings.BASE_DIR)))
+
+    def test_cache_is_written_outside_project(self):
+        self.assertFalse(settings.CACHES['default']['LOCATION'].startswith(
+            str(settings.BASE_DIR)))
+        self.assertFalse(cache._path.startswith(str(settings.BASE_DIR)))
+
+
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user = User.objects.create_user(username='profiled')
+        Post.objects.create(author=user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.settings = override_settings(PROFILE_DIR=self.directory)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_signed_header_profiles_request(self):
+        response = self.client.get(
+            reverse('posts:index'), HTTP_X_PROFILE=profiling.make_token())
+        name = response['X-Profile-File']
+        self.assertIn('posts_index', name)
+        self.assertRegex(name, r'-\d+q-\d+ms$')
+        path = os.path.join(self.directory, name)
+        stats = pstats.Stats(f'{path}.prof')
+        self.assertTrue(any(
+            function == 'index' for _, _, function in stats.stats))
+        with open(f'{path}.collapsed') as collapsed:
+            for line in collapsed:
+                self.assertRegex(line, r'^\S+ \d+$')
+
+    def test_query_flag_profiles_request(self):
+        response = self.client.get(
+            reverse('posts:index'), {'profile': profiling.make_token()})
+        self.assertTrue(response.has_header('X-Profile-File'))
+
+    @override_settings(PROFILE_TOKEN_MAX_DUMPS=1)
+    def test_dumps_per_token_are_limited(self):
+        token = profiling.make_token()
+        for profiled in (True, False):
+            response = self.client.get(
+                reverse('posts:index'), HTTP_X_PROFILE=token)
+            self.assertEqual(
+                response.has_header('X-Profile-File'), profiled)
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+    def test_bad_token_is_ignored(self):
+        response = self.client.get(
+            reverse('posts:index'), HTTP_X_PROFILE='profile:forged')
+        self.assertFalse(response.has_header('X-Profile-File'))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_sampled_request_is_profiled_silently(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('X-Profile-File'))
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+    def test_disabled_middleware_is_not_loaded(self):
+        self.settings.disable()
+        try:
+            with self.assertRaises(MiddlewareNotUsed):
+                profiling.ProfilingMiddleware(lambda request: None)
+        finally:
+            self.settings.enable()
+
+
+class SQLStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.settings = override_settings(
+            METRICS_PATH=os.path.join(cls.directory, 'metrics.sqlite3'))
+        cls.settings.enable()
+        cls.user = User.objects.create_user(username='sqlstats')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_fingerprint_hides_literals(self):
+        first = sqlstats.fingerprint(
+            "SELECT * FROM t WHERE id IN (%s, %s) AND name = 'a' LIMIT 21")
+        second = sqlstats.fingerprint(
+            "SELECT *  FROM t WHERE id IN (%s) AND name = 'b''c' LIMIT 1")
+        self.assertEqual(first, second)
+        self.assertEqual(
+            first[1], 'SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?')
+        self.assertEqual(
+            sqlstats.fingerprint('INSERT INTO t VALUES (%s, %s), (%s, %s)')[1],
+            'INSERT INTO t VALUES (...)')
+
+    def test_report_groups_queries_by_view(self):
+        self.client.get(reverse('posts:profile', args=['sqlstats']))
+        rows = sqlstats.report(by_view=True)
+        profile = [row for row in rows if row['view'] == 'posts:profile']
+        self.assertTrue(profile)
+        for row in profile:
+            self.assertGreater(row['count'], 0)
+            self.assertTrue(row['sql'])
+        self.assertTrue(any(
+            'FROM "posts_post"' in row['sql'] for row in profile))
+
+    @override_settings(SLOW_QUERY_THRESHOLD=0)
+    def test_slow_query_is_logged_with_origin(self):
+        with self.assertLogs('core.sqlstats', 'WARNING') as logs:
+            self.client.get(reverse('posts:profile', args=['sqlstats']))
+        self.assertTrue(any(
+            'posts/views.py' in message for message in logs.output))
+        self.assertTrue(any(
+            record.view_name == 'posts:profile' for record in logs.records))
+
+    def test_sqlreport_command(self):
+        self.client.get(reverse('posts:index'))
+        out = StringIO()
+        call_command('sqlreport', limit=5, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 6)
+        out = StringIO()
+        call_command('sqlreport', json=True, by_view=True, stdout=out)
+        rows = json.loads(out.getvalue())
+        self.assertEqual(
+            {'fingerprint', 'view', 'sql', 'count', 'total', 'p99'},
+            set(rows[0]))
+
+
+class ReplayTests(LiveServerTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='replay')
+        self.post = Post.objects.create(author=self.user, text='Пост')
+        self.directory = tempfile.mkdtemp()
+        self.trace = os.path.join(self.directory, 'trace.jsonl')
+        records = [
+            {'path': '/'},
+            {'path': '/follow/', 'user': 'replay'},
+            {'method': 'post', 'user': 'replay',
+             'path': f'/posts/{self.post.pk}/comment/',
+             'body': {'text': 'Из трассы'}},
+            {'path': '/nonexist-page/'},
+        ]
+        with open(self.trace, 'w') as trace:
+            trace.writelines(json.dumps(record) + '\n' for record in records)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def replay(self, *args, **options):
+        out = StringIO()
+        call_command('replay', self.trace, *args, json=True, stdout=out,
+                     **options)
+        return json.loads(out.getvalue())
+
+    def check(self, report):
+        self.assertEqual(report['requests'], 4)
+        self.assertEqual(report['error_rate'], 0)
+        urls = report['urls']
+        self.assertEqual(urls['posts:main']['statuses'], {'200': 1})
+        self.assertEqual(urls['posts:follow_index']['statuses'], {'200': 1})
+        self.assertEqual(urls['posts:add_comment']['statuses'], {'302': 1})
+        self.assertEqual(urls['-']['statuses'], {'404': 1})
+        self.assertTrue(self.post.comments.filter(text='Из трассы').exists())
+
+    def test_in_process_replay(self):
+        self.check(self.replay(workers=1))
+
+    def test_socket_replay(self):
+        self.check(self.replay(workers=1, target=self.live_server_url))
+
+
+class StartupTests(SimpleTestCase):
+    IMPORTTIME = (
+        'import time: self [us] | cumulative | imported package\n'
+        'import time:       100 |        100 |   posts.models\n'
+        'import time:        50 |        150 | posts\n'
+        'import time:        30 |         30 |     django.contrib.auth\n'
+        'import time:        20 |         50 |   django.db\n'
+        'import time:        10 |         10 | postsx\n'
+    )
+
+    def test_warm(self):
+        resolvers, templates = startup.warm()
+        self.assertGreater(resolvers, 1)
+        self.assertGreater(templates, 0)
+
+    def test_imports_grouped_by_app(self):
+        times = startup.parse_importtime(self.IMPORTTIME)
+        self.assertEqual(times['posts.models'], 100)
+        groups = startup.group_by_app(
+            times, ['posts.apps.PostsConfig', 'django.contrib.auth'])
+        self.assertEqual(groups, {
+            'posts': 150, 'django.contrib.auth': 30, 'django': 20,
+            'postsx': 10})
+
+    def test_prod_settings(self):
+        from yatube.settings import dev, prod
+        self.assertFalse(prod.DEBUG)
+        self.assertNotIn('debug_toolbar', prod.INSTALLED_APPS)
+        self.assertIn('debug_toolbar', dev.INSTALLED_APPS)
+        options = prod.TEMPLATES[0]['OPTIONS']
+        self.assertEqual(
+            options['loaders'][0][0], 'django.template.loaders.cached.Loader')
+
+    def test_startupbench_command(self):
+        out = StringIO()
+        call_command(
+            'startupbench', 'yatube.settings.prod', runs=1, json=True,
+            stdout=out)
+        result = json.loads(out.getvalue())['yatube.settings.prod']
+        self.assertGreater(result['setup_ms'], 0)
+        self.assertIn('posts', result['imports_ms'])
+        self.assertIn('django', result['imports_ms'])
@@ -0,0 +1,152 @@
+"""Время обработки запроса по составляющим: база, шаблоны, миниатюры.
+
+``TimingMiddleware`` заводит на время запроса объект ``RequestTimings``
+в локальном для потока состоянии, а источники сами добавляют в него
+время:
+
+* ``query_timer`` - обертка ``execute_wrapper``, которую
+  ``install_query_timer`` ставит на каждое новое соединение; считает
+  запросы и их суммарное время (``db``);
+* шаблонный бэкенд ``core.template_backends.DjangoTemplates`` замеряет
+  рендеринг шаблонов (``tpl``);
+* ``span(name)`` - контекстный менеджер и декоратор для остального,
+  например, поиска миниатюр (``thumb``).
+
+Итог уходит в заголовок ``Server-Timing`` (его показывают инструменты
+разработчика браузера), строкой ``key=value`` в журнал ``core.timing``
+уровня INFO с именем представления из ``resolver_match.view_name`` и в
+метрики ``core.metrics``.
+
+Вне запроса все замеры сводятся к одной проверке ``None``, внутри - к
+паре вызовов ``perf_counter``, поэтому middleware можно держать
+включенным в продакшене. Тело потоковых ответов отдается уже после
+выхода из middleware и в ``total`` не входит.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+
+from django.conf import settings
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+
+
+class RequestTimings:
+    """Накопленное за запрос время по именам составляющих, в секундах."""
+
+    __slots__ = ('request', 'spans', 'queries', 'active')
+
+    def __init__(self, request=None):
+        self.request = request
+        self.spans = {}
+        self.queries = 0
+        # Открытые сейчас составляющие: вложенный замер того же имени
+        # (шаблон, подключенный из шаблона) не должен считаться дважды.
+        self.active = set()
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0) + seconds
+
+    def header(self):
+        parts = []
+        for name, seconds in self.spans.items():
+            part = f'{name};dur={seconds * 1000:.1f}'
+            if name == 'db':
+                part += f';desc="{self.queries} queries"'
+            parts.append(part)
+        return ', '.join(parts)
+
+
+def current():
+    """Замеры текущего запроса или ``None`` вне запроса."""
+    return getattr(_state, 'timings', None)
+
+
+def view_name():
+    """Имя представления текущего запроса, если URL уже разобран."""
+    timings = current()
+    match = timings and timings.request and timings.request.resolver_match
+    return match.view_name if match else '-'
+
+
+@contextmanager
+def span(name):
+    """Добавить время блока к составляющей ``name`` текущего запроса."""
+    timings = current()
+    if timings is None or name in timings.active:
+        yield
+        return
+    timings.active.add(name)
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, perf_counter() - started)
+        timings.active.discard(name)
+
+
+def query_timer(execute, sql, params, many, context):
+    timings = getattr(_state, 'timings', None)
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.add('db', perf_counter() - started)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """Обработчик ``connection_created``: замер запросов соединения.
+
+    Обертка ставится первой, чтобы в ``db`` входили и повторы
+    ``core.sqlite.busy_retry``.
+    """
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, query_timer)
+
+
+class TimingMiddleware:
+    """Замеряет запрос и отдает итог в Server-Timing, журнал и метрики."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        previous = current()
+        timings = _state.timings = RequestTimings(request)
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.timings = previous
+        total = perf_counter() - started
+        timings.add('total', total)
+        match = request.resolver_match
+        view_name = match.view_name if match else '-'
+        metrics.REQUESTS.inc(view_name, request.method, response.status_code)
+        metrics.REQUEST_SECONDS.observe(total, view_name)
+        metrics.REQUEST_QUERIES.observe(timings.queries, view_name)
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = timings.header()
+        if logger.isEnabledFor(logging.INFO):
+            self.log(request, response, view_name, timings)
+        return response
+
+    def log(self, request, response, view_name, timings):
+        fields = {
+            f'{name}_ms': round(seconds * 1000, 1)
+            for name, seconds in timings.spans.items()
+        }
+        fields['queries'] = timings.queries
+        logger.info(
+            'view=%s method=%s status=%s %s',
+            view_name, request.method, response.status_code,
+            ' '.join(f'{key}={value}' for key, value in fields.items()),
+            extra={'view_name': view_name, 'timings': fields})
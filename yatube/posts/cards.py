@@ -0,0 +1,47 @@
+"""Кэш отрендеренных карточек записей для лент.
+
+Ключ карточки включает ``Post.edited`` и все видимые в ней поля
+связанных объектов, поэтому правка записи сама по себе дает новый ключ,
+а страница ленты собирается одним ``get_many``.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core import metrics
+
+CARD_TEMPLATE = 'posts/includes/post_list.html'
+
+
+def card_key(post):
+    group_slug = post.group.slug if post.group_id else ''
+    source = (
+        f'{post.edited.isoformat()}|{post.author.username}|'
+        f'{post.author.get_full_name()}|{group_slug}')
+    digest = hashlib.md5(source.encode()).hexdigest()
+    return f'post-card:{post.pk}:{digest}'
+
+
+def render_cards(posts):
+    """Вернуть пары (запись, html карточки), дорендерив недостающие."""
+    posts = {card_key(post): post for post in posts}
+    cached = cache.get_many(posts)
+    rendered = {}
+    cards = []
+    for key, post in posts.items():
+        card = cached.get(key)
+        if card is None:
+            card = rendered[key] = render_to_string(
+                CARD_TEMPLATE, {'post': post})
+        cards.append((post, mark_safe(card)))
+    if rendered:
+        cache.set_many(rendered, settings.FRAGMENT_CACHE_TIMEOUT)
+    metrics.cache_result('fragment', len(cached), len(rendered))
+    return cards
+
+
+def forget_card(post):
+    cache.delete(card_key(post))
@@ -0,0 +1,98 @@
+"""Денормализованные счетчики записей, комментариев и подписок.
+
+Счетчики меняются атомарными ``UPDATE ... SET x = x + 1`` из сигналов
+(см. ``posts.signals``), а ``manage.py recount`` пересчитывает их по
+исходным таблицам и чинит расхождения.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from core.sqlite import retry_on_busy
+from posts.models import Comment, Follow, Group, Post, User, UserCounters
+
+TOTAL_POSTS_KEY = 'posts:total'
+TOTAL_POSTS_TIMEOUT = 300
+
+
+def _bump(queryset, field, delta):
+    """Атомарно изменить счетчик, не опуская его ниже нуля."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+@retry_on_busy
+def bump_user(user_id, field, delta):
+    """Изменить счетчик пользователя, создав строку при необходимости."""
+    counters = UserCounters.objects.filter(user_id=user_id)
+    with transaction.atomic():
+        if not _bump(counters, field, delta) and delta > 0:
+            UserCounters.objects.get_or_create(user_id=user_id)
+            _bump(counters, field, delta)
+
+
+def bump_group(group_id, delta):
+    if group_id is not None:
+        _bump(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def bump_post(post_id, delta):
+    _bump(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def total_posts():
+    """Общее число записей, закэшированное на ``TOTAL_POSTS_TIMEOUT``.
+
+    Используется только для нумерации страниц главной ленты, поэтому
+    небольшое отставание от базы допустимо.
+    """
+    return cache.get_or_set(
+        TOTAL_POSTS_KEY, Post.objects.count, TOTAL_POSTS_TIMEOUT)
+
+
+def _actual(model, field):
+    """Подзапрос с фактическим количеством строк ``model`` по ``field``."""
+    counted = model.objects.filter(**{field: OuterRef('pk')}).order_by()
+    counted = counted.values(field).annotate(total=Count('pk'))
+    return Coalesce(Subquery(counted.values('total')), Value(0))
+
+
+def _repair(queryset, field, actual, dry_run):
+    drifted = queryset.annotate(actual=actual).exclude(
+        **{field: F('actual')})
+    fixed = drifted.count()
+    if fixed and not dry_run:
+        queryset.filter(pk__in=drifted.values('pk')).update(
+            **{field: actual})
+    return fixed
+
+
+def repair(dry_run=False):
+    """Пересчитать все счетчики; вернуть число исправленных строк."""
+    with transaction.atomic():
+        if not dry_run:
+            missing = User.objects.filter(counters__isnull=True)
+            UserCounters.objects.bulk_create(
+                (UserCounters(user_id=pk)
+                 for pk in missing.values_list('pk', flat=True)),
+                batch_size=500)
+        counters = UserCounters.objects.all()
+        return {
+            'group.posts_count': _repair(
+                Group.objects.all(), 'posts_count',
+                _actual(Post, 'group'), dry_run),
+            'post.comments_count': _repair(
+                Post.objects.all(), 'comments_count',
+                _actual(Comment, 'post'), dry_run),
+            'user.posts_count': _repair(
+                counters, 'posts_count',
+                _actual(Post, 'author'), dry_run),
+            'user.followers_count': _repair(
+                counters, 'followers_count',
+                _actual(Follow, 'author'), dry_run),
+            'user.following_count': _repair(
+                counters, 'following_count',
+                _actual(Follow, 'user'), dry_run),
+        }
@@ -0,0 +1,186 @@
+"""Ленты RSS 2.0, Atom и JSON Feed для главной, групп и авторов.
+
+Документ не собирается в памяти целиком: элементы сериализуются по
+одному поверх ``QuerySet.iterator()`` и сразу уходят клиенту через
+``StreamingHttpResponse``. Готовый документ попутно сохраняется в кэш
+под ключом с версиями тех же областей, что и у HTML-страниц, поэтому
+сигналы моделей инвалидируют ленты вместе со страницами.
+"""
+import json
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import rfc2822_date, rfc3339_date
+from django.utils.text import Truncator
+
+from core import metrics
+from core.cache import conditional_page, get_validators
+from posts.models import Group, Post, User
+
+FEED_KEY = 'feed:{}:{}:{}'
+CONTENT_TYPES = {
+    'rss': 'application/rss+xml; charset=utf-8',
+    'atom': 'application/atom+xml; charset=utf-8',
+    'json': 'application/feed+json; charset=utf-8',
+}
+# Ленты длиннее не кэшируются, чтобы не держать их в памяти целиком.
+MAX_CACHED_SIZE = 2 ** 20
+
+
+def _item(request, post):
+    return {
+        'id': request.build_absolute_uri(
+            reverse('posts:post_detail', args=[post.pk])),
+        'title': Truncator(post.text).chars(50),
+        'text': post.text,
+        'author': post.author.get_full_name() or post.author.username,
+        'group': post.group.title if post.group_id else None,
+        'published': post.pub_date,
+        'updated': post.edited,
+    }
+
+
+def _rss(meta, items):
+    yield (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<rss version="2.0"><channel>'
+        f'<title>{escape(meta["title"])}</title>'
+        f'<link>{escape(meta["link"])}</link>'
+        f'<description>{escape(meta["title"])}</description>'
+        f'<language>{settings.LANGUAGE_CODE}</language>')
+    for item in items:
+        category = (
+            f'<category>{escape(item["group"])}</category>'
+            if item['group'] else '')
+        yield (
+            f'<item><title>{escape(item["title"])}</title>'
+            f'<link>{escape(item["id"])}</link>'
+            f'<guid>{escape(item["id"])}</guid>'
+            f'<description>{escape(item["text"])}</description>'
+            f'<author>{escape(item["author"])}</author>{category}'
+            f'<pubDate>{rfc2822_date(item["published"])}</pubDate></item>')
+    yield '</channel></rss>'
+
+
+def _atom(meta, items):
+    yield (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom" '
+        f'xml:lang="{settings.LANGUAGE_CODE}">'
+        f'<title>{escape(meta["title"])}</title>'
+        f'<link href={quoteattr(meta["link"])} rel="alternate"/>'
+        f'<link href={quoteattr(meta["self"])} rel="self"/>'
+        f'<id>{escape(meta["link"])}</id>'
+        f'<updated>{rfc3339_date(meta["updated"])}</updated>')
+    for item in items:
+        category = (
+            f'<category term={quoteattr(item["group"])}/>'
+            if item['group'] else '')
+        yield (
+            f'<entry><title>{escape(item["title"])}</title>'
+            f'<link href={quoteattr(item["id"])} rel="alternate"/>'
+            f'<id>{escape(item["id"])}</id>'
+            f'<published>{rfc3339_date(item["published"])}</published>'
+            f'<updated>{rfc3339_date(item["updated"])}</updated>'
+            f'<author><name>{escape(item["author"])}</name></author>'
+            f'{category}<content type="text">{escape(item["text"])}'
+            '</content></entry>')
+    yield '</feed>'
+
+
+def _json(meta, items):
+    header = json.dumps({
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': meta['title'],
+        'home_page_url': meta['link'],
+        'feed_url': meta['self'],
+        'language': settings.LANGUAGE_CODE,
+    }, ensure_ascii=False)
+    yield header[:-1] + ', "items": ['
+    separator = ''
+    for item in items:
+        yield separator + json.dumps({
+            'id': item['id'],
+            'url': item['id'],
+            'title': item['title'],
+            'content_text': item['text'],
+            'authors': [{'name': item['author']}],
+            'tags': [item['group']] if item['group'] else [],
+            'date_published': item['published'].isoformat(),
+            'date_modified': item['updated'].isoformat(),
+        }, ensure_ascii=False)
+        separator = ', '
+    yield ']}'
+
+
+SERIALIZERS = {'rss': _rss, 'atom': _atom, 'json': _json}
+
+
+def _cached_stream(key, chunks):
+    """Отдавать части документа и сохранить его в кэш, если он невелик."""
+    parts, size = [], 0
+    for chunk in chunks:
+        chunk = chunk.encode()
+        yield chunk
+        if parts is not None:
+            parts.append(chunk)
+            size += len(chunk)
+            if size > MAX_CACHED_SIZE:
+                parts = None
+    if parts is not None:
+        cache.set(key, b''.join(parts), settings.PAGE_CACHE_TIMEOUT)
+
+
+def _feed_response(request, fmt, scopes, title, link, posts):
+    if fmt not in SERIALIZERS:
+        raise Http404
+    versions, modified = get_validators(scopes)
+    key = FEED_KEY.format(
+        fmt, request.build_absolute_uri(request.path),
+        '.'.join(map(str, versions)))
+    cached = cache.get(key)
+    metrics.cache_result('feed', cached is not None, cached is None)
+    if cached is not None:
+        content = [cached]
+    else:
+        meta = {
+            'title': title,
+            'link': request.build_absolute_uri(link),
+            'self': request.build_absolute_uri(request.path),
+            'updated': datetime.fromtimestamp(modified, timezone.utc),
+        }
+        posts = posts.order_by('-pub_date', '-id')[:settings.FEED_LENGTH]
+        items = (
+            _item(request, post)
+            for post in posts.iterator(chunk_size=settings.FEED_CHUNK_SIZE))
+        content = _cached_stream(key, SERIALIZERS[fmt](meta, items))
+    return StreamingHttpResponse(content, content_type=CONTENT_TYPES[fmt])
+
+
+@conditional_page('feed', 'groups')
+def index_feed(request, fmt):
+    return _feed_response(
+        request, fmt, ['feed', 'groups'], 'Последние обновления на сайте',
+        reverse('posts:index'), Post.objects.for_feed())
+
+
+@conditional_page('group:{slug}')
+def group_feed(request, slug, fmt):
+    group = get_object_or_404(Group, slug=slug)
+    return _feed_response(
+        request, fmt, [f'group:{slug}'], f'Записи группы {group.title}',
+        reverse('posts:group_list', args=[slug]), group.posts.for_feed())
+
+
+@conditional_page('profile:{username}', 'groups')
+def profile_feed(request, username, fmt):
+    author = get_object_or_404(User, username=username)
+    return _feed_response(
+        request, fmt, [f'profile:{username}', 'groups'],
+        f'Записи пользователя {author.get_full_name() or username}',
+        reverse('posts:profile', args=[username]), author.posts.for_feed())
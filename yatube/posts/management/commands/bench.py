@@ -0,0 +1,147 @@
+import json
+import time
+from contextlib import ExitStack
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.loadtest import percentile
+from posts import urls
+from posts.models import Follow, Group, Post
+
+# Представления, меняющие данные: по умолчанию не измеряются.
+WRITE_VIEWS = {'add_comment', 'profile_follow', 'profile_unfollow'}
+
+
+def response_size(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+class Command(BaseCommand):
+    help = ('Измеряет задержку, число запросов к БД и размер ответа '
+            'для каждого адреса posts/urls.py')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Сколько раз запросить каждый адрес')
+        parser.add_argument(
+            '--warmup', type=int, default=3,
+            help='Сколько запросов не учитывать')
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом')
+        parser.add_argument(
+            '--anonymous', action='store_true',
+            help='Запрашивать страницы без авторизации')
+        parser.add_argument(
+            '--include-writes', action='store_true',
+            help='Измерять и представления, меняющие данные')
+        parser.add_argument(
+            '--output', help='Записать результат в файл вместо stdout')
+
+    def handle(self, *args, **options):
+        sample = self.sample()
+        client = Client()
+        if not options['anonymous']:
+            client.force_login(sample['user'])
+        results = {}
+        for pattern in urls.urlpatterns:
+            name = pattern.name
+            if name in WRITE_VIEWS and not options['include_writes']:
+                continue
+            kwargs = {
+                key: sample[key] for key in pattern.pattern.converters}
+            path = reverse(f'{urls.app_name}:{name}', kwargs=kwargs)
+            if name == 'search':
+                path += '?' + urlencode({'q': sample['query']})
+            results[name] = self.measure(client, path, options)
+        report = {
+            'meta': {
+                'requests': options['requests'],
+                'warmup': options['warmup'],
+                'cold': options['cold'],
+                'anonymous': options['anonymous'],
+                'posts': Post.objects.count(),
+                'database': connection.vendor,
+            },
+            'urls': results,
+        }
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(data)
+            self.stdout.write(self.style.SUCCESS(
+                f'Результат записан в {options["output"]}'))
+        else:
+            self.stdout.write(data)
+
+    def sample(self):
+        """Значения аргументов адресов.
+
+        Страницы смотрит пользователь с наибольшим числом подписок, а
+        запись берется самая обсуждаемая из его собственных, чтобы
+        страница правки тоже отвечала 200.
+        """
+        follower = Follow.objects.values('user').annotate(
+            total=Count('pk')).order_by('-total').first()
+        posts = Post.objects.order_by('-comments_count', '-pk')
+        post = follower and posts.filter(author=follower['user']).first()
+        post = post or posts.first()
+        group = Group.objects.order_by('-posts_count').first()
+        if post is None or group is None:
+            raise CommandError(
+                'Нет записей или групп: сначала выполните manage.py seed')
+        words = post.text.split()
+        return {
+            'user': post.author,
+            'slug': group.slug,
+            'username': post.author.username,
+            'post_id': post.pk,
+            'fmt': 'rss',
+            'query': words[0] if words else 'a',
+        }
+
+    def measure(self, client, path, options):
+        timings, queries = [], []
+        status = size = 0
+        total = options['warmup'] + options['requests']
+        for number in range(total):
+            if options['cold']:
+                cache.clear()
+            with ExitStack() as stack:
+                # Чтения с реплик тоже считаются (см. core.replicas).
+                captured = [
+                    stack.enter_context(
+                        CaptureQueriesContext(connections[alias]))
+                    for alias in (DEFAULT_DB_ALIAS,
+                                  *settings.DATABASE_REPLICAS)
+                ]
+                started = time.perf_counter()
+                response = client.get(path)
+                size = response_size(response)
+                elapsed = time.perf_counter() - started
+            status = response.status_code
+            if number >= options['warmup']:
+                timings.append(elapsed * 1000)
+                queries.append(sum(map(len, captured)))
+        return {
+            'path': path,
+            'status': status,
+            'p50_ms': round(percentile(timings, 0.5), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3)
+            if timings else 0,
+            'queries': max(queries, default=0),
+            'bytes': size,
+        }
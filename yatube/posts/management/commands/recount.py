@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счетчики и чинит расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не исправляя')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        drift = counters.repair(dry_run=dry_run)
+        for name, rows in drift.items():
+            self.stdout.write(f'{name}: {rows}')
+        total = sum(drift.values())
+        if not total:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+        elif dry_run:
+            self.stdout.write(self.style.WARNING(
+                f'Найдено расхождений: {total}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Исправлено расхождений: {total}'))
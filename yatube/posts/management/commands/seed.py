@@ -0,0 +1,226 @@
+import io
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from core.tasks import enqueue
+from posts import counters
+from posts.models import Comment, Follow, Group, Post, User
+from posts.thumbnails import generate_thumbnails
+
+PASSWORD = 'seed-password'
+
+# Сразу только последние TIMELINE_LENGTH записей каждой ленты: у
+# популярных авторов тысячи подписчиков, и полная рассылка с последующей
+# обрезкой записала бы миллионы строк.
+FILL_TIMELINE = '''
+    INSERT INTO posts_timelineentry (user_id, post_id, pub_date)
+    SELECT %s, id, pub_date FROM posts_post
+    WHERE author_id IN (
+        SELECT author_id FROM posts_follow WHERE user_id = %s)
+    ORDER BY pub_date DESC, id DESC
+    LIMIT %s
+'''
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Отключить ``auto_now``/``auto_now_add``, чтобы задать даты самим."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def power_law(count, exponent):
+    """Веса ``1 / rank ** exponent``: немногие получают почти все."""
+    return [1 / rank ** exponent for rank in range(1, count + 1)]
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'записями, комментариями и подписками')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя')
+        parser.add_argument(
+            '--images', type=int, default=10,
+            help='Сколько разных картинок сгенерировать')
+        parser.add_argument(
+            '--image-ratio', type=float, default=0.3,
+            help='Доля записей с картинкой')
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределить даты записей')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.batch_size = options['batch_size']
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            groups = self.create_groups(options['groups'])
+            images = self.create_images(options['images'])
+            posts = self.create_posts(
+                users, groups, images, options)
+            self.create_comments(users, posts, options['comments'])
+            self.create_follows(users, options['follows'])
+            self.fill_timelines(users)
+            drift = counters.repair()
+        for post_id in self.image_posts.values():
+            enqueue(
+                generate_thumbnails, post_id,
+                dedupe_key=f'thumbnails:{post_id}')
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: пользователей {len(users)}, групп {len(groups)}, '
+            f'записей {len(posts)}, комментариев {options["comments"]}; '
+            f'пересчитано счетчиков {sum(drift.values())}'))
+
+    def bulk(self, model, objects):
+        # Django 2.2 не ограничивает явный batch_size лимитами SQLite на
+        # число параметров и термов составного SELECT.
+        limit = connection.ops.bulk_batch_size(
+            model._meta.concrete_fields, [])
+        return model.objects.bulk_create(
+            objects, batch_size=min(self.batch_size, limit))
+
+    def create_users(self, count):
+        password = make_password(PASSWORD)
+        prefix = self.fake.unique.lexify('????').lower()
+        self.bulk(User, (
+            User(
+                username=f'{prefix}{number}',
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                email=f'{prefix}{number}@example.com',
+                password=password)
+            for number in range(count)))
+        return list(User.objects.filter(
+            username__startswith=prefix).order_by('pk').values_list(
+            'pk', flat=True))
+
+    def create_groups(self, count):
+        prefix = self.fake.unique.lexify('????').lower()
+        self.bulk(Group, (
+            Group(
+                title=self.fake.sentence(nb_words=3)[:200],
+                slug=f'{prefix}-{number}',
+                description=self.fake.paragraph())
+            for number in range(count)))
+        return list(Group.objects.filter(
+            slug__startswith=f'{prefix}-').values_list('pk', flat=True))
+
+    def create_images(self, count):
+        names = []
+        for number in range(count):
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            buffer = io.BytesIO()
+            Image.new('RGB', (1200, 800), color).save(buffer, 'JPEG')
+            names.append(default_storage.save(
+                f'posts/seed-{number}.jpg', ContentFile(buffer.getvalue())))
+        return names
+
+    def create_posts(self, users, groups, images, options):
+        now = timezone.now()
+        span = timedelta(days=options['days']).total_seconds()
+        # Пишут в основном самые активные авторы.
+        authors = self.random.choices(
+            users, power_law(len(users), 1.2), k=options['posts'])
+        fields = (Post._meta.get_field('pub_date'),
+                  Post._meta.get_field('edited'))
+        with explicit_dates(*fields):
+            posts = []
+            for author in authors:
+                pub_date = now - timedelta(
+                    seconds=self.random.uniform(0, span))
+                image = ''
+                if images and self.random.random() < options['image_ratio']:
+                    image = self.random.choice(images)
+                posts.append(Post(
+                    author_id=author,
+                    group_id=(self.random.choice(groups)
+                              if groups and self.random.random() < 0.7
+                              else None),
+                    text=self.fake.paragraph(nb_sentences=5),
+                    image=image,
+                    pub_date=pub_date,
+                    edited=pub_date))
+            self.bulk(Post, posts)
+        created = Post.objects.filter(author_id__in=set(authors)).order_by(
+            '-pk')[:len(posts)].values_list('pk', 'pub_date', 'image')
+        self.image_posts = {}
+        result = []
+        for pk, pub_date, image in created:
+            result.append((pk, pub_date))
+            if image:
+                self.image_posts.setdefault(image, pk)
+        return result
+
+    def create_comments(self, users, posts, count):
+        if not posts:
+            return
+        # Обсуждают в основном немногие популярные записи.
+        shuffled = self.random.sample(posts, len(posts))
+        targets = self.random.choices(
+            shuffled, power_law(len(shuffled), 1.0), k=count)
+        field = Comment._meta.get_field('pub_date')
+        now = timezone.now()
+        with explicit_dates(field):
+            self.bulk(Comment, (
+                Comment(
+                    post_id=post_id,
+                    author_id=self.random.choice(users),
+                    text=self.fake.sentence(),
+                    pub_date=min(
+                        pub_date + timedelta(
+                            hours=self.random.expovariate(1 / 24)),
+                        now))
+                for post_id, pub_date in targets))
+
+    def create_follows(self, users, average):
+        # Популярность авторов распределена по степенному закону, число
+        # подписок у пользователя - по Парето со средним ``average``.
+        weights = power_law(len(users), 1.0)
+        pairs = set()
+        for user in users:
+            wanted = min(
+                int(self.random.paretovariate(2) * average / 2),
+                len(users) - 1)
+            for author in self.random.choices(users, weights, k=wanted):
+                if author != user:
+                    pairs.add((user, author))
+        self.bulk(Follow, (
+            Follow(user_id=user, author_id=author)
+            for user, author in pairs))
+
+    def fill_timelines(self, users):
+        if not users:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(FILL_TIMELINE, [
+                (user, user, settings.TIMELINE_LENGTH) for user in users])
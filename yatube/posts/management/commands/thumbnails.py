@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.thumbnails import backfill
+
+
+class Command(BaseCommand):
+    help = ('Ставит в очередь создание миниатюр для записей, у которых их '
+            'еще нет (например, загруженных до очереди миниатюр)')
+
+    def handle(self, *args, **options):
+        queued = backfill()
+        self.stdout.write(self.style.SUCCESS(
+            f'Поставлено в очередь записей: {queued}'))
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='edited',
+            field=models.DateTimeField(auto_now=True, help_text='Обновляется при каждом сохранении записи', verbose_name='Дата изменения'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+from django.db import migrations
+
+# Записи и комментарии лежат в одном индексе FTS5: rowid = id * 2 для
+# записей и id * 2 + 1 для комментариев, поэтому триггеры обновляют
+# индекс по rowid без поиска.
+CREATE_SQL = (
+    'CREATE VIRTUAL TABLE posts_search USING fts5('
+    "text, post_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')",
+    '''CREATE TRIGGER posts_post_search_insert AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO posts_search (rowid, text, post_id)
+        VALUES (NEW.id * 2, NEW.text, NEW.id);
+    END''',
+    '''CREATE TRIGGER posts_post_search_update AFTER UPDATE OF text
+    ON posts_post
+    BEGIN
+        UPDATE posts_search SET text = NEW.text WHERE rowid = NEW.id * 2;
+    END''',
+    '''CREATE TRIGGER posts_post_search_delete AFTER DELETE ON posts_post
+    BEGIN
+        DELETE FROM posts_search WHERE rowid = OLD.id * 2;
+    END''',
+    '''CREATE TRIGGER posts_comment_search_insert AFTER INSERT
+    ON posts_comment
+    BEGIN
+        INSERT INTO posts_search (rowid, text, post_id)
+        VALUES (NEW.id * 2 + 1, NEW.text, NEW.post_id);
+    END''',
+    '''CREATE TRIGGER posts_comment_search_update AFTER UPDATE OF text
+    ON posts_comment
+    BEGIN
+        UPDATE posts_search SET text = NEW.text
+        WHERE rowid = NEW.id * 2 + 1;
+    END''',
+    '''CREATE TRIGGER posts_comment_search_delete AFTER DELETE
+    ON posts_comment
+    BEGIN
+        DELETE FROM posts_search WHERE rowid = OLD.id * 2 + 1;
+    END''',
+    '''INSERT INTO posts_search (rowid, text, post_id)
+    SELECT id * 2, text, id FROM posts_post''',
+    '''INSERT INTO posts_search (rowid, text, post_id)
+    SELECT id * 2 + 1, text, post_id FROM posts_comment''',
+)
+
+DROP_SQL = (
+    'DROP TRIGGER IF EXISTS posts_post_search_insert',
+    'DROP TRIGGER IF EXISTS posts_post_search_update',
+    'DROP TRIGGER IF EXISTS posts_post_search_delete',
+    'DROP TRIGGER IF EXISTS posts_comment_search_insert',
+    'DROP TRIGGER IF EXISTS posts_comment_search_update',
+    'DROP TRIGGER IF EXISTS posts_comment_search_delete',
+    'DROP TABLE IF EXISTS posts_search',
+)
+
+
+def run(statements):
+    def apply(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_edited'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE_SQL), run(DROP_SQL)),
+    ]
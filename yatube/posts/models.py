@@ -17,6 +17,11 @@ class Group(models.Model):
     description = models.TextField(
         verbose_name='Описание группы',
         help_text='Введите описание группы')
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество записей',
+        help_text='Поддерживается сигналами, пересчитывается командой recount')
 
     class Meta:
         verbose_name = 'Группа'
@@ -26,6 +31,11 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        return self.select_related('author', 'group')
+
+
 class Post(CreatedModel):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -51,9 +61,27 @@ class Post(CreatedModel):
         help_text='Изображение для записи'
     )
     pub_date = models.DateTimeField(auto_now_add=True)
+    edited = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+        help_text='Обновляется при каждом сохранении записи')
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев',
+        help_text='Поддерживается сигналами, пересчитывается командой recount')
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'),
+                         name='post_date_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_date_idx'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_date_idx'),)
         verbose_name = 'Запись'
         verbose_name_plural = 'Записи'
 
@@ -82,6 +110,9 @@ class Comment(CreatedModel):
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('post', '-pub_date', '-id'),
+                         name='comment_post_date_idx'),)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -108,8 +139,79 @@ class Follow(models.Model):
         constraints = (
             models.UniqueConstraint(fields=('user', 'author'),
                                     name='unique_pair'),)
+        indexes = (
+            models.Index(fields=('author', 'user'),
+                         name='follow_author_user_idx'),)
         verbose_name = 'Модель Follow (user фолловит author)'
         verbose_name_plural = 'Модели Follow'
 
     def __str__(self):
         return(f'Пользователь {self.user} фолловит пользователя {self.author}')
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Владелец ленты',
+        help_text='Пользователь, в чью ленту подписок попала запись')
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Запись',
+        help_text='Запись автора, на которого подписан пользователь')
+
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации записи',
+        help_text='Копия Post.pub_date для сортировки ленты по индексу')
+
+    class Meta:
+        ordering = ('-pub_date', '-post_id')
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'post'),
+                                    name='unique_timeline_entry'),)
+        indexes = (
+            models.Index(fields=('user', '-pub_date', '-post'),
+                         name='timeline_user_date_idx'),)
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Ленты подписок'
+
+    def __str__(self):
+        return f'Запись {self.post_id} в ленте пользователя {self.user_id}'
+
+
+class UserCounters(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+        verbose_name='Пользователь',
+        help_text='Пользователь, к которому относятся счетчики')
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество записей')
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписчиков')
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписок')
+
+    class Meta:
+        verbose_name = 'Счетчики пользователя'
+        verbose_name_plural = 'Счетчики пользователей'
+
+    def __str__(self):
+        return f'Счетчики пользователя {self.user_id}'
+
+    @classmethod
+    def for_user(cls, user):
+        """Счетчики пользователя или нулевые, если строки еще нет."""
+        try:
+            return user.counters
+        except cls.DoesNotExist:
+            return cls(user=user)
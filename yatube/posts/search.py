@@ -0,0 +1,109 @@
+"""Полнотекстовый поиск по записям и комментариям (SQLite FTS5).
+
+Индекс ``posts_search`` создается миграцией ``0014_search_index`` и
+обновляется триггерами базы, поэтому он не расходится с данными даже
+при ``QuerySet.update`` и ``bulk_create``. В индексе ``rowid`` записи
+равен ``id * 2``, комментария - ``id * 2 + 1``.
+
+Результаты упорядочены по релевантности (bm25) и листаются по ключу
+``(rank, rowid)`` без OFFSET: курсор страницы хранит ранг и ``rowid``
+последнего результата.
+"""
+import base64
+import re
+from collections import namedtuple
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from posts.models import Post
+
+SearchHit = namedtuple('SearchHit', 'post snippet is_comment')
+
+MAX_TERMS = 8
+SNIPPET_WORDS = 16
+# Метки подсветки, которых не бывает в тексте: snippet() вставляет их до
+# экранирования HTML, а после они заменяются на <mark>.
+MARK_START, MARK_END = '\x02', '\x03'
+
+SEARCH_SQL = f'''
+    SELECT rowid, post_id, rank,
+           snippet(posts_search, 0, %s, %s, '…', {SNIPPET_WORDS})
+    FROM posts_search
+    WHERE posts_search MATCH %s {{after}}
+    ORDER BY rank, rowid
+    LIMIT %s
+'''
+AFTER_SQL = 'AND (rank > %s OR (rank = %s AND rowid > %s))'
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def to_match(query):
+    """Запрос пользователя в выражение FTS5: слова ищутся по префиксу.
+
+    Операторы FTS5 в запросе не интерпретируются, поэтому любая строка
+    дает корректное выражение (или пустую строку, если слов нет).
+    """
+    terms = re.findall(r'\w+', query or '')[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def encode_cursor(rank, rowid):
+    raw = f'{rank!r}|{rowid}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        rank, rowid = base64.urlsafe_b64decode(
+            cursor + padding).decode().split('|')
+        return float(rank), int(rowid)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+
+
+def _highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+
+def matching_ids(query, kind):
+    """Подзапрос с ``id`` записей (``kind=0``) или комментариев (1)."""
+    return RawSQL(
+        'SELECT rowid / 2 FROM posts_search '
+        'WHERE posts_search MATCH %s AND rowid %% 2 = %s',
+        (to_match(query), kind))
+
+
+def search(query, limit, cursor=None):
+    """Страница результатов и курсор следующей страницы (или ``None``)."""
+    match = to_match(query)
+    if not match or not available():
+        return [], None
+    params = [MARK_START, MARK_END, match]
+    after = decode_cursor(cursor) if cursor else None
+    if after is not None:
+        rank, rowid = after
+        params += [rank, rank, rowid]
+    sql = SEARCH_SQL.format(after=AFTER_SQL if after else '')
+    with connection.cursor() as db:
+        db.execute(sql, params + [limit + 1])
+        rows = db.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][2], rows[-1][0])
+    posts = Post.objects.for_feed().in_bulk(
+        {post_id for _, post_id, _, _ in rows})
+    hits = [
+        SearchHit(posts[post_id], _highlight(snippet), rowid % 2 == 1)
+        for rowid, post_id, _, snippet in rows if post_id in posts
+    ]
+    return hits, next_cursor
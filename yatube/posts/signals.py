@@ -0,0 +1,158 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import cache
+from posts import cards, counters, thumbnails, timeline
+from posts.models import Comment, Follow, Group, Post, User
+
+
+def _group_scope(group_id):
+    if group_id is None:
+        return None
+    slug = Group.objects.filter(pk=group_id).values_list(
+        'slug', flat=True).first()
+    return f'group:{slug}' if slug else None
+
+
+def _profile_scope(user_id):
+    username = User.objects.filter(pk=user_id).values_list(
+        'username', flat=True).first()
+    return f'profile:{username}' if username else None
+
+
+def _bump_pages(*scopes):
+    # Версии меняются только после коммита: иначе параллельное чтение
+    # между bump и коммитом закэшировало бы старые строки под новой
+    # версией. Области вычисляются сейчас, пока строки еще видны.
+    scopes = [scope for scope in scopes if scope]
+    transaction.on_commit(lambda: cache.bump(*scopes))
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        previous = Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'image').first()
+        (instance._previous_group_id,
+         instance._previous_image) = previous or (None, None)
+
+
+@receiver(pre_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def forget_post_card(sender, instance, raw=False, **kwargs):
+    if instance.pk and instance.edited and not raw:
+        try:
+            cards.forget_card(instance)
+        except ObjectDoesNotExist:
+            pass
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def thumbnail_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created or instance.image.name != getattr(
+            instance, '_previous_image', None):
+        thumbnails.queue_thumbnails(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump_user(instance.author_id, 'posts_count', 1)
+        counters.bump_group(instance.group_id, 1)
+        return
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id != instance.group_id:
+        counters.bump_group(previous_group_id, -1)
+        counters.bump_group(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'posts_count', -1)
+    counters.bump_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.prune(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_user(instance.author_id, 'followers_count', 1)
+        counters.bump_user(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'followers_count', -1)
+    counters.bump_user(instance.user_id, 'following_count', -1)
+
+
+@receiver(pre_save, sender=Group)
+def remember_slug(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._previous_scope = _group_scope(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    _bump_pages(
+        'feed',
+        f'post:{instance.pk}',
+        _profile_scope(instance.author_id),
+        _group_scope(instance.group_id),
+        _group_scope(getattr(instance, '_previous_group_id', None)))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, **kwargs):
+    _bump_pages(
+        'groups',
+        f'group:{instance.slug}',
+        getattr(instance, '_previous_scope', None))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    _bump_pages(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, **kwargs):
+    _bump_pages(
+        _profile_scope(instance.author_id), f'follows:{instance.user_id}')
@@ -0,0 +1,10 @@
+from django import template
+
+from posts.thumbnails import lookup_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_thumbnail(image, size):
+    return lookup_thumbnail(image, size)
@@ -1,20 +1,31 @@
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase
 from django.urls import reverse
-from posts.models import Post
+from core.cache import get_versions
+from core.testing import OnCommitMixin
+from posts.cards import card_key, render_cards
+from posts.models import Comment, Group, Post
 
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 User = get_user_model()
 
 
-class CacheTests(TestCase):
+class CacheTests(OnCommitMixin, TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
         cls.user = User.objects.create_user(username='test')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(CacheTests.user)
@@ -25,7 +36,7 @@ class CacheTests(TestCase):
             group=None,
             text='Тестовый пост')
         index_page = self.authorized_client.get(reverse('posts:main')).content
-        post.delete()
+        Post.objects.filter(pk=post.pk).update(text='Изменено в обход ORM')
         index_page_cached = self.authorized_client.get(
             reverse('posts:main')).content
         self.assertEqual(index_page, index_page_cached)
@@ -33,3 +44,140 @@ class CacheTests(TestCase):
         index_page_new = self.authorized_client.get(
             reverse('posts:main')).content
         self.assertNotEqual(index_page, index_page_new)
+
+    def test_cache_invalidated_on_change(self):
+        pages = (
+            reverse('posts:main'),
+            reverse('posts:group_list', kwargs={'slug': 'test'}),
+            reverse('posts:profile', kwargs={'username': 'test'}),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                author=CacheTests.user,
+                group=CacheTests.group,
+                text='Тестовый пост')
+        for url in pages:
+            with self.subTest(url=url):
+                self.guest_client.get(url)
+                self.assertContains(
+                    self.guest_client.get(url), 'Тестовый пост')
+        post.text = 'Отредактированный пост'
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        for url in pages:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.guest_client.get(url), 'Отредактированный пост')
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+        for url in pages:
+            with self.subTest(url=url):
+                self.assertNotContains(
+                    self.guest_client.get(url), 'Отредактированный пост')
+
+    def test_versions_change_only_after_commit(self):
+        before = get_versions(['feed'])
+        with self.captureOnCommitCallbacks() as callbacks:
+            Post.objects.create(author=CacheTests.user, text='Тестовый пост')
+            self.assertEqual(get_versions(['feed']), before)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_versions(['feed']), before)
+
+    def test_post_cards_are_cached_until_edit(self):
+        post = Post.objects.create(
+            author=CacheTests.user,
+            group=CacheTests.group,
+            text='Тестовый пост')
+        posts = list(Post.objects.for_feed())
+        render_cards(posts)
+        self.assertIn('Тестовый пост', cache.get(card_key(posts[0])))
+        with self.assertTemplateNotUsed('posts/includes/post_list.html'):
+            render_cards(posts)
+        post.text = 'Отредактированный пост'
+        post.save()
+        self.assertIsNone(cache.get(card_key(posts[0])))
+        [(_, card)] = render_cards(Post.objects.for_feed())
+        self.assertIn('Отредактированный пост', card)
+
+
+class ConditionalGetTests(OnCommitMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            group=cls.group,
+            text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.pages = (
+            reverse('posts:post_detail',
+                    kwargs={'post_id': ConditionalGetTests.post.id}),
+            reverse('posts:group_list', kwargs={'slug': 'test'}),
+            reverse('posts:profile', kwargs={'username': 'test'}),
+        )
+
+    def test_not_modified_without_rendering(self):
+        for url in self.pages:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response['Cache-Control'], 'max-age=0')
+                with CaptureQueriesContext(connection) as queries:
+                    by_etag = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag'])
+                    by_date = self.guest_client.get(
+                        url,
+                        HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(by_etag.status_code, 304)
+                self.assertEqual(by_date.status_code, 304)
+                self.assertEqual(len(queries), 0)
+
+    def test_changes_invalidate_validators(self):
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.pages}
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(
+                post=ConditionalGetTests.post,
+                author=ConditionalGetTests.user,
+                text='Комментарий')
+            post = ConditionalGetTests.post
+            post.text = 'Отредактированный пост'
+            post.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_new_login_invalidates_etag(self):
+        user = User.objects.create_user(username='reader', password='pass')
+        credentials = {'username': 'reader', 'password': 'pass'}
+        url = self.pages[0]
+        client = Client()
+        client.post(reverse('users:login'), credentials)
+        etag = client.get(url)['ETag']
+        self.assertEqual(
+            client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        client.post(reverse('users:logout'))
+        client.post(reverse('users:login'), credentials)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user'], user)
+
+    def test_validators_depend_on_user(self):
+        url = self.pages[0]
+        etag = self.guest_client.get(url)['ETag']
+        client = Client()
+        client.force_login(ConditionalGetTests.user)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertIn('private', response['Cache-Control'])
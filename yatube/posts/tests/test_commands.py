@@ -0,0 +1,91 @@
+import json
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from core import replicas
+from posts import counters
+from posts.models import (Comment, Follow, Group, Post, TimelineEntry,
+                          UserCounters)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedBenchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'seed', users=20, groups=3, posts=60, comments=100,
+            follows=4, images=2, image_ratio=0.5, seed=1,
+            batch_size=16, stdout=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_creates_consistent_data(self):
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertFalse(any(counters.repair(dry_run=True).values()))
+        self.assertEqual(UserCounters.objects.count(), 20)
+        entry = TimelineEntry.objects.select_related('post').first()
+        self.assertTrue(Follow.objects.filter(
+            user_id=entry.user_id, author_id=entry.post.author_id).exists())
+
+    def test_seed_spreads_dates(self):
+        dates = Post.objects.values_list('pub_date', flat=True)
+        self.assertGreater(max(dates) - min(dates), timedelta(days=1))
+
+    def test_bench_reports_every_read_url(self):
+        out = StringIO()
+        call_command('bench', requests=2, warmup=0, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertNotIn('add_comment', report['urls'])
+        for name, result in report['urls'].items():
+            with self.subTest(name=name):
+                self.assertEqual(result['status'], 200)
+                self.assertGreater(result['bytes'], 0)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchReplicaTests(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        call_command(
+            'seed', users=5, groups=2, posts=20, comments=10, follows=2,
+            images=0, seed=1, stdout=StringIO())
+        replicas._health['replica'] = True, time.monotonic()
+
+    def tearDown(self):
+        replicas._health.clear()
+
+    def test_bench_counts_replica_queries(self):
+        def bench():
+            cache.clear()
+            out = StringIO()
+            call_command(
+                'bench', requests=1, warmup=0, cold=True, anonymous=True,
+                stdout=out)
+            return json.loads(out.getvalue())['urls']['main']
+
+        primary = bench()
+        with override_settings(DATABASE_REPLICAS=['replica']):
+            replicated = bench()
+        self.assertGreater(primary['queries'], 0)
+        self.assertEqual(replicated['queries'], primary['queries'])
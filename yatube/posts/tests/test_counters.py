@@ -0,0 +1,98 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from posts.models import Comment, Follow, Group, Post, UserCounters
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+        cls.group2 = Group.objects.create(
+            title='Тестовая группа2',
+            slug='test2',
+            description='Тестовое описание2',
+        )
+
+    def counters(self, user):
+        return UserCounters.for_user(User.objects.get(pk=user.pk))
+
+    def test_post_counters(self):
+        post = Post.objects.create(
+            author=CountersTests.author,
+            group=CountersTests.group,
+            text='Тестовый пост',
+        )
+        self.assertEqual(self.counters(CountersTests.author).posts_count, 1)
+        post.group = CountersTests.group2
+        post.save()
+        CountersTests.group.refresh_from_db()
+        CountersTests.group2.refresh_from_db()
+        self.assertEqual(CountersTests.group.posts_count, 0)
+        self.assertEqual(CountersTests.group2.posts_count, 1)
+        post.delete()
+        CountersTests.group2.refresh_from_db()
+        self.assertEqual(CountersTests.group2.posts_count, 0)
+        self.assertEqual(self.counters(CountersTests.author).posts_count, 0)
+
+    def test_comment_counter(self):
+        post = Post.objects.create(
+            author=CountersTests.author,
+            text='Тестовый пост',
+        )
+        comment = Comment.objects.create(
+            post=post,
+            author=CountersTests.user,
+            text='Комментарий',
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_follow_counters(self):
+        follow = Follow.objects.create(
+            user=CountersTests.user,
+            author=CountersTests.author,
+        )
+        self.assertEqual(
+            self.counters(CountersTests.author).followers_count, 1)
+        self.assertEqual(
+            self.counters(CountersTests.user).following_count, 1)
+        follow.delete()
+        self.assertEqual(
+            self.counters(CountersTests.author).followers_count, 0)
+        self.assertEqual(
+            self.counters(CountersTests.user).following_count, 0)
+
+    def test_recount_repairs_drift(self):
+        Post.objects.create(
+            author=CountersTests.author,
+            group=CountersTests.group,
+            text='Тестовый пост',
+        )
+        Group.objects.filter(pk=CountersTests.group.pk).update(
+            posts_count=7)
+        UserCounters.objects.filter(user=CountersTests.author).update(
+            posts_count=0)
+        out = StringIO()
+        call_command('recount', stdout=out)
+        self.assertIn('Исправлено расхождений: 2', out.getvalue())
+        CountersTests.group.refresh_from_db()
+        self.assertEqual(CountersTests.group.posts_count, 1)
+        self.assertEqual(self.counters(CountersTests.author).posts_count, 1)
+        out = StringIO()
+        call_command('recount', stdout=out)
+        self.assertIn('Расхождений нет', out.getvalue())
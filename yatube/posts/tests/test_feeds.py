@@ -0,0 +1,85 @@
+import json
+from xml.etree import ElementTree
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core.testing import OnCommitMixin
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class FeedsTests(OnCommitMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='test', first_name='Тест')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            group=cls.group,
+            text='Тестовый пост <b>&</b>',
+        )
+        Post.objects.create(author=cls.user, text='Пост без группы')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def get(self, name, fmt, **kwargs):
+        response = self.guest_client.get(
+            reverse(f'posts:{name}', kwargs={'fmt': fmt, **kwargs}))
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return b''.join(response.streaming_content)
+
+    def test_formats(self):
+        rss = ElementTree.fromstring(self.get('index_feed', 'rss'))
+        self.assertEqual(len(rss.findall('channel/item')), 2)
+        self.assertEqual(
+            rss.find('channel/item/description').text, 'Пост без группы')
+        atom = ElementTree.fromstring(
+            self.get('group_feed', 'atom', slug='test'))
+        ns = {'atom': 'http://www.w3.org/2005/Atom'}
+        [entry] = atom.findall('atom:entry', ns)
+        self.assertEqual(
+            entry.find('atom:content', ns).text, 'Тестовый пост <b>&</b>')
+        feed = json.loads(self.get('profile_feed', 'json', username='test'))
+        self.assertEqual(len(feed['items']), 2)
+        self.assertEqual(feed['items'][0]['authors'], [{'name': 'Тест'}])
+
+    def test_unknown_format_and_group(self):
+        response = self.guest_client.get(
+            reverse('posts:index_feed', kwargs={'fmt': 'xml'}))
+        self.assertEqual(response.status_code, 404)
+        response = self.guest_client.get(
+            reverse('posts:group_feed', kwargs={'fmt': 'rss', 'slug': 'no'}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_feed_is_cached_until_change(self):
+        first = self.get('index_feed', 'rss')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get('index_feed', 'rss'), first)
+        self.assertEqual(len(queries), 0)
+        post = FeedsTests.post
+        post.text = 'Отредактированный пост'
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        self.assertIn(
+            'Отредактированный пост'.encode(), self.get('index_feed', 'rss'))
+
+    def test_conditional_get(self):
+        url = reverse(
+            'posts:group_feed', kwargs={'fmt': 'atom', 'slug': 'test'})
+        etag = self.guest_client.get(url)['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,87 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Полный проход по таблице (SCAN без индекса) или сортировка во
+# временном B-дереве означают, что запросу не хватает индекса.
+FULL_SCAN = re.compile(r'\bSCAN (?!.*\bUSING (COVERING )?INDEX\b)')
+TEMP_SORT = re.compile(r'\bTEMP B-TREE\b')
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(15):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                group=cls.group,
+                text=f'Тестовый пост {i}',
+            )
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(QueryPlanTests.user)
+
+    def explain(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexedQueries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            for step in self.explain(sql):
+                with self.subTest(sql=sql, step=step):
+                    self.assertIsNone(FULL_SCAN.search(step))
+                    self.assertIsNone(TEMP_SORT.search(step))
+        return response
+
+    def test_feed_queries_use_indexes(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test'}),
+            reverse('posts:profile', kwargs={'username': 'writer'}),
+            reverse('posts:post_detail',
+                    kwargs={'post_id': QueryPlanTests.post.id}),
+            reverse('posts:post_comments',
+                    kwargs={'post_id': QueryPlanTests.post.id}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.assertIndexedQueries(url)
+                page = response.context.get('page_obj')
+                if page is not None and page.paginator.next_cursor:
+                    self.assertIndexedQueries(
+                        f'{url}?cursor={page.paginator.next_cursor}')
+
+    def test_follower_lookup_uses_covering_index(self):
+        followers = Follow.objects.filter(
+            author=QueryPlanTests.author).values_list('user_id', flat=True)
+        [step] = self.explain(*followers.query.sql_with_params())
+        self.assertIn('COVERING INDEX follow_author_user_idx', step)
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост про котиков и собак',
+        )
+        cls.other = Post.objects.create(
+            author=cls.user,
+            text='Пост про погоду',
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.other,
+            author=cls.user,
+            text='А у меня кот <b>рыжий</b>',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, query, **params):
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': query, **params})
+        return response.context['hits']
+
+    def test_search_posts_and_comments(self):
+        hits = self.search('кот')
+        self.assertEqual(
+            {(hit.post, hit.is_comment) for hit in hits},
+            {(SearchTests.post, False), (SearchTests.other, True)})
+        snippet = next(hit.snippet for hit in hits if hit.is_comment)
+        self.assertIn('<mark>кот</mark>', snippet)
+        self.assertIn('&lt;b&gt;', snippet)
+
+    def test_index_follows_changes(self):
+        Post.objects.filter(pk=SearchTests.other.pk).update(text='Про снег')
+        self.assertEqual(
+            [hit.post for hit in self.search('снег')], [SearchTests.other])
+        SearchTests.comment.delete()
+        self.assertEqual(
+            [hit.post for hit in self.search('кот')], [SearchTests.post])
+
+    def test_query_syntax_is_ignored(self):
+        self.assertEqual(self.search('"кот"* (-'), self.search('кот'))
+        self.assertEqual(self.search('***'), [])
+
+    @override_settings(NUM_POSTS=1)
+    def test_cursor_pagination(self):
+        response = self.guest_client.get(reverse('posts:search'), {'q': 'кот'})
+        first = response.context['hits']
+        cursor = response.context['next_cursor']
+        self.assertIsNotNone(cursor)
+        second = self.search('кот', cursor=cursor)
+        self.assertEqual(len(first + second), 2)
+        self.assertNotEqual(first, second)
+        self.assertIsNone(
+            self.guest_client.get(
+                reverse('posts:search'), {'q': 'кот', 'cursor': cursor}
+            ).context['next_cursor'])
+
+    def test_admin_uses_index(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_comment_changelist'), {'q': 'рыжий'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [SearchTests.comment])
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'кот'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [SearchTests.post])
@@ -0,0 +1,87 @@
+import shutil
+import tempfile
+from django.conf import settings
+from io import StringIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from core.models import Task
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails, lookup_thumbnail
+
+from django.core.cache import cache
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test')
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=small_gif,
+                content_type='image/gif'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_template_shows_placeholder_until_ready(self):
+        url = reverse(
+            'posts:post_detail', kwargs={'post_id': ThumbnailTests.post.id})
+        self.assertIsNone(lookup_thumbnail(ThumbnailTests.post.image, 'card'))
+        self.assertContains(self.guest_client.get(url), 'placeholder.png')
+        generate_thumbnails(ThumbnailTests.post.id)
+        thumbnail = lookup_thumbnail(ThumbnailTests.post.image, 'card')
+        self.assertIsNotNone(thumbnail)
+        response = self.guest_client.get(url)
+        self.assertNotContains(response, 'placeholder.png')
+        self.assertContains(response, thumbnail.url)
+
+    def test_saving_new_image_enqueues_once(self):
+        # Записи из админки и shell сохраняются мимо представлений.
+        key = f'thumbnails:{ThumbnailTests.post.id}'
+        self.assertEqual(Task.objects.filter(dedupe_key=key).count(), 1)
+        Task.objects.filter(dedupe_key=key).delete()
+        post = Post.objects.get(pk=ThumbnailTests.post.id)
+        post.text = 'Другой текст'
+        post.save()
+        self.assertFalse(Task.objects.filter(dedupe_key=key).exists())
+        post.image = SimpleUploadedFile(
+            name='other.gif',
+            content=ThumbnailTests.post.image.open('rb').read(),
+            content_type='image/gif')
+        post.save()
+        self.assertEqual(Task.objects.filter(dedupe_key=key).count(), 1)
+
+    def test_backfill_command_enqueues_missing(self):
+        Task.objects.all().delete()
+        call_command('thumbnails', stdout=StringIO())
+        key = f'thumbnails:{ThumbnailTests.post.id}'
+        self.assertTrue(Task.objects.filter(dedupe_key=key).exists())
+        Task.objects.all().delete()
+        generate_thumbnails(ThumbnailTests.post.id)
+        call_command('thumbnails', stdout=StringIO())
+        self.assertFalse(Task.objects.exists())
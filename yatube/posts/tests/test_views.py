@@ -5,10 +5,13 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from core.testing import QueryBudgetMixin
 from posts.forms import PostForm
-from posts.models import Group, Post, Follow
+from posts.models import Comment, Group, Post, Follow
 
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 User = get_user_model()
 
@@ -244,6 +247,128 @@ class PaginatorTests(TestCase):
                                 kwargs={'username': username}) + '?page=2'))
         self.assertEqual(len(response.context['page_obj']), 5)
 
+    def test_cursor_navigation(self):
+        first_page = self.authorized_client.get(
+            reverse('posts:index')).context['page_obj']
+        self.assertIsNone(first_page.paginator.previous_cursor)
+        with CaptureQueriesContext(connection) as queries:
+            second_page = self.authorized_client.get(
+                reverse('posts:index')
+                + f'?cursor={first_page.paginator.next_cursor}'
+            ).context['page_obj']
+        self.assertEqual(len(second_page), 5)
+        self.assertEqual(second_page.number, 2)
+        self.assertFalse(second_page.has_next())
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries))
+        back_page = self.authorized_client.get(
+            reverse('posts:index')
+            + f'?cursor={second_page.paginator.previous_cursor}'
+        ).context['page_obj']
+        self.assertEqual(back_page.object_list, first_page.object_list)
+        self.assertFalse(back_page.has_previous())
+
+    def test_page_navigation_is_elided(self):
+        Group.objects.filter(pk=PaginatorTests.group.pk).update(
+            posts_count=50000)
+        response = self.authorized_client.get(
+            reverse('posts:group_list',
+                    kwargs={'slug': PaginatorTests.group.slug}))
+        paginator = response.context['page_obj'].paginator
+        self.assertEqual(paginator.num_pages, 5000)
+        self.assertEqual(
+            paginator.elided_page_range, [1, 2, paginator.ELLIPSIS, 5000])
+        self.assertEqual(response.content.decode().count('page-item'), 5)
+        self.assertContains(response, 'href="?page=last"')
+        self.assertNotContains(response, 'href="?page=2"')
+
+    def test_last_page_is_read_without_offset(self):
+        url = reverse('posts:group_list',
+                      kwargs={'slug': PaginatorTests.group.slug})
+        oldest = list(Post.objects.order_by('-pub_date', '-id'))[10:]
+        for page in ('last', '100'):
+            with self.subTest(page=page):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_client.get(
+                        url, {'page': page})
+                page_obj = response.context['page_obj']
+                self.assertEqual(page_obj.number, 2)
+                self.assertEqual(list(page_obj), oldest)
+                self.assertFalse(page_obj.has_next())
+                self.assertFalse(any(
+                    'OFFSET' in query['sql'] for query in queries))
+        previous = self.authorized_client.get(
+            url, {'cursor': page_obj.paginator.previous_cursor})
+        self.assertEqual(len(previous.context['page_obj']), 10)
+
+    def test_deep_page_number_falls_back_to_first_page(self):
+        Group.objects.filter(pk=PaginatorTests.group.pk).update(
+            posts_count=50000)
+        response = self.authorized_client.get(
+            reverse('posts:group_list',
+                    kwargs={'slug': PaginatorTests.group.slug}),
+            {'page': 4000})
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+    def test_invalid_cursor_returns_first_page(self):
+        response = self.authorized_client.get(
+            reverse('posts:index') + '?cursor=broken')
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+
+@override_settings(NUM_COMMENTS=5)
+class CommentsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+        )
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'reader{i}'),
+                text=f'Комментарий {i}',
+            )
+            for i in range(12)
+        ]
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_comments_are_paginated_newest_first(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(
+                reverse('posts:post_detail',
+                        kwargs={'post_id': CommentsTests.post.id}))
+        comments = response.context['comments']
+        self.assertEqual(
+            list(comments), CommentsTests.comments[::-1][:5])
+        self.assertLessEqual(len(queries), 2)
+        self.assertContains(response, comments.paginator.next_cursor)
+
+    def test_fragment_loads_next_comments(self):
+        url = reverse('posts:post_comments',
+                      kwargs={'post_id': CommentsTests.post.id})
+        loaded, cursor = [], ''
+        for _ in range(3):
+            response = self.guest_client.get(url, {'cursor': cursor})
+            self.assertTemplateNotUsed(response, 'base.html')
+            comments = response.context['comments']
+            loaded += list(comments)
+            cursor = comments.paginator.next_cursor
+        self.assertIsNone(cursor)
+        self.assertEqual(loaded, CommentsTests.comments[::-1])
+
+    def test_fragment_of_missing_post(self):
+        response = self.guest_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 0}))
+        self.assertEqual(response.status_code, 404)
+
 
 class FollowTests(TestCase):
     @classmethod
@@ -309,3 +434,82 @@ class FollowTests(TestCase):
                     get(reverse('posts:follow_index'))).context['page_obj']
         self.assertTrue(
             post not in response.object_list)
+
+    def test_follow_backfills_and_unfollow_prunes_timeline(self):
+        post = Post.objects.create(
+            author=FollowTests.user_2,
+            text='Пост до подписки',)
+        Follow.objects.create(
+            user=FollowTests.user_1,
+            author=FollowTests.user_2
+        )
+        self.assertTrue(FollowTests.user_1.timeline.filter(
+            post=post).exists())
+        (self.authorized_client_1.
+            get(reverse('posts:profile_unfollow',
+                kwargs={'username': FollowTests.user_2})))
+        self.assertFalse(FollowTests.user_1.timeline.exists())
+
+    @override_settings(TIMELINE_LENGTH=2)
+    def test_timeline_is_capped(self):
+        Follow.objects.create(
+            user=FollowTests.user_1,
+            author=FollowTests.user_2
+        )
+        posts = [
+            Post.objects.create(
+                author=FollowTests.user_2,
+                text=f'Тестовый пост {i}',)
+            for i in range(3)
+        ]
+        timeline = FollowTests.user_1.timeline.values_list(
+            'post', flat=True)
+        self.assertEqual(list(timeline), [posts[2].id, posts[1].id])
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    query_budgets = {
+        'posts:index': 4,
+        'posts:group_list': 4,
+        'posts:profile': 5,
+        'posts:post_detail': 4,
+        'posts:follow_index': 3,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='reader', first_name='Читатель')
+        cls.author = User.objects.create_user(
+            username='writer', first_name='Автор')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(settings.NUM_POSTS):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                group=cls.group,
+                text=f'Тестовый пост {i}',
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(QueryBudgetTests.user)
+
+    def test_feed_pages_fit_query_budget(self):
+        pages = (
+            ('posts:index', {}),
+            ('posts:group_list', {'slug': QueryBudgetTests.group.slug}),
+            ('posts:profile', {'username': QueryBudgetTests.author}),
+            ('posts:post_detail', {'post_id': QueryBudgetTests.post.id}),
+            ('posts:follow_index', {}),
+        )
+        for url_name, kwargs in pages:
+            with self.subTest(url_name=url_name):
+                self.assertQueryBudget(
+                    self.authorized_client, url_name, **kwargs)
@@ -0,0 +1,85 @@
+"""Миниатюры изображений записей, которые готовятся при загрузке.
+
+Шаблоны не генерируют миниатюры сами: тег ``ready_thumbnail`` только
+ищет готовую миниатюру в key-value хранилище sorl, а генерацию ставит в
+очередь задач ``core.tasks`` сигнал ``post_save`` записи, когда у нее
+появляется новое изображение - откуда бы запись ни сохранялась (сайт,
+API, админка, shell). Миниатюры записей, загруженных раньше или
+потерянных, досоздает ``manage.py thumbnails`` (``backfill``).
+"""
+import time
+
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from core import metrics
+from core.tasks import enqueue
+from core.timing import span
+from posts.models import Post
+
+# Все размеры, в которых шаблоны показывают изображения записей.
+THUMBNAIL_SIZES = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+
+def _backend_options(source, options):
+    """Дополнить опции так же, как это делает ``ThumbnailBackend``."""
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+@span('thumb')
+def lookup_thumbnail(image, size):
+    """Готовая миниатюра или ``None``; изображение не открывается."""
+    if not image:
+        return None
+    geometry, options = THUMBNAIL_SIZES[size]
+    source = ImageFile(image)
+    name = default.backend._get_thumbnail_filename(
+        source, geometry, _backend_options(source, options))
+    return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def generate_thumbnails(post_id):
+    """Создать все миниатюры записи и обновить ее карточки и страницы."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    for size, (geometry, options) in THUMBNAIL_SIZES.items():
+        started = time.perf_counter()
+        get_thumbnail(post.image, geometry, **options)
+        metrics.THUMBNAIL_SECONDS.observe(
+            time.perf_counter() - started, size)
+    post.save(update_fields=['edited'])
+
+
+def queue_thumbnails(post):
+    """Поставить генерацию миниатюр в очередь задач."""
+    if post.image:
+        enqueue(
+            generate_thumbnails, post.pk,
+            dedupe_key=f'thumbnails:{post.pk}')
+
+
+def backfill():
+    """Поставить в очередь записи без готовых миниатюр; вернуть их число."""
+    queued = 0
+    posts = Post.objects.exclude(image='').only('pk', 'image')
+    for post in posts.iterator():
+        if any(lookup_thumbnail(post.image, size) is None
+               for size in THUMBNAIL_SIZES):
+            queue_thumbnails(post)
+            queued += 1
+    return queued
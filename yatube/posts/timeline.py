@@ -0,0 +1,66 @@
+"""Материализованные ленты подписок (fan-out on write).
+
+При публикации записи она сразу раскладывается в ленты всех подписчиков
+автора, поэтому ``follow_index`` читает ленту одним проходом по индексу
+``(user, -pub_date, -post)`` без соединения с ``Follow``.
+"""
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+
+from core.paginator import CursorPaginator
+from posts.models import Follow, Post, TimelineEntry, User
+
+
+class TimelinePaginator(CursorPaginator):
+    """Курсорная пагинация ленты, отдающая на страницу сами записи."""
+
+    id_field = 'post_id'
+
+    def _make_page(self, rows, number, has_next):
+        page = super()._make_page(rows, number, has_next)
+        page.object_list = [entry.post for entry in rows]
+        return page
+
+
+def fan_out(post):
+    """Добавить новую запись в ленты всех подписчиков автора."""
+    follower_ids = list(Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True))
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in follower_ids),
+        batch_size=500,
+        ignore_conflicts=True)
+    trim(follower_ids)
+
+
+def backfill(user_id, author_id):
+    """Перенести последние записи автора в ленту нового подписчика."""
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id').values_list('id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts[:settings.TIMELINE_LENGTH]),
+        batch_size=500,
+        ignore_conflicts=True)
+    trim([user_id])
+
+
+def prune(user_id, author_id):
+    """Убрать записи автора из ленты отписавшегося пользователя."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def trim(user_ids):
+    """Обрезать ленты пользователей до ``TIMELINE_LENGTH`` записей."""
+    length = settings.TIMELINE_LENGTH
+    cutoff = TimelineEntry.objects.filter(
+        user=OuterRef('pk')).order_by('-pub_date', '-post_id').values(
+        'pub_date')[length:length + 1]
+    overflow = User.objects.filter(pk__in=user_ids).annotate(
+        cutoff=Subquery(cutoff)).filter(cutoff__isnull=False).values_list(
+        'pk', 'cutoff')
+    for user_id, cutoff in overflow:
+        TimelineEntry.objects.filter(
+            user_id=user_id, pub_date__lte=cutoff).delete()
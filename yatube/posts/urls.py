@@ -1,5 +1,5 @@
 from django.urls import path
-from posts import views
+from posts import feeds, views
 
 app_name = 'posts'
 urlpatterns = [
@@ -7,12 +7,23 @@ urlpatterns = [
     path('index', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('feed/<str:fmt>/', feeds.index_feed, name='index_feed'),
+    path('group/<slug:slug>/feed/<str:fmt>/',
+         feeds.group_feed,
+         name='group_feed'),
+    path('profile/<str:username>/feed/<str:fmt>/',
+         feeds.profile_feed,
+         name='profile_feed'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('posts/<int:post_id>/comments/',
+         views.post_comments,
+         name='post_comments'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/',
          views.add_comment,
          name='add_comment'),
+    path('search/', views.search, name='search'),
     path('follow/', views.follow_index, name='follow_index'),
     path('profile/<str:username>/follow/',
          views.profile_follow,
@@ -1,47 +1,63 @@
+from django.http import Http404
 from django.shortcuts import get_object_or_404, render, redirect
-from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
-from django.views.decorators.cache import cache_page
+from core.cache import conditional_page, versioned_cache_page
+from core.paginator import CursorPaginator
+from core.replicas import use_replica
+from posts import counters, search as post_search
 from posts.forms import PostForm, CommentForm
-from posts.models import Group, Post, User, Follow
+from posts.models import Comment, Group, Post, User, Follow, UserCounters
+from posts.timeline import TimelinePaginator
 
 
-@cache_page(20)
+@use_replica
+@versioned_cache_page(settings.PAGE_CACHE_TIMEOUT, 'feed', 'groups')
 def index(request):
     title = 'Последние обновления на сайте'
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, settings.NUM_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.for_feed()
+    paginator = CursorPaginator(
+        post_list, settings.NUM_POSTS, total=counters.total_posts())
+    page_obj = paginator.get_page(
+        request.GET.get('page'), cursor=request.GET.get('cursor'))
     context = {
         'title': title,
         'page_obj': page_obj, }
     return render(request, 'posts/index.html', context)
 
 
+@use_replica
+@conditional_page('group:{slug}')
+@versioned_cache_page(settings.PAGE_CACHE_TIMEOUT, 'group:{slug}')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, settings.NUM_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = group.posts.for_feed()
+    paginator = CursorPaginator(
+        posts, settings.NUM_POSTS, total=group.posts_count)
+    page_obj = paginator.get_page(
+        request.GET.get('page'), cursor=request.GET.get('cursor'))
     context = {
         'group': group,
         'page_obj': page_obj, }
     return render(request, 'posts/group_list.html', context)
 
 
+@use_replica
+@conditional_page('profile:{username}', 'groups')
+@versioned_cache_page(
+    settings.PAGE_CACHE_TIMEOUT, 'profile:{username}', 'groups',
+    anonymous_only=True)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('counters'), username=username)
     name = author.get_full_name()
-    post_list = author.posts.all()
-    count = post_list.count()
-    paginator = Paginator(post_list, settings.NUM_POSTS)
-    page_number = request.GET.get('page')
+    post_list = author.posts.for_feed()
+    count = UserCounters.for_user(author).posts_count
+    paginator = CursorPaginator(post_list, settings.NUM_POSTS, total=count)
     following = (request.user.is_authenticated and Follow.
                  objects.filter(user=request.user, author=author))
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginator.get_page(
+        request.GET.get('page'), cursor=request.GET.get('cursor'))
     context = {
         'author': author,
         'count': count,
@@ -52,11 +68,25 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+def _comments_page(request, post_id, total=None):
+    comment_list = Comment.objects.filter(
+        post_id=post_id).select_related('author')
+    paginator = CursorPaginator(
+        comment_list, settings.NUM_COMMENTS, total=total)
+    return paginator.get_page(
+        request.GET.get('page'), cursor=request.GET.get('cursor'))
+
+
+@use_replica
+@conditional_page('post:{post_id}', 'feed', 'groups')
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.for_feed().select_related('author__counters'),
+        id=post_id)
     group = post.group
     form = CommentForm(request.POST)
-    comments = post.comments.all()
+    comments = _comments_page(
+        request, post.id, total=post.comments_count)
     context = {
         'group': group,
         'post': post,
@@ -65,6 +95,28 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@use_replica
+def post_comments(request, post_id):
+    """Следующая порция комментариев - HTML-фрагмент для подгрузки."""
+    if not Post.objects.filter(id=post_id).exists():
+        raise Http404
+    context = {
+        'post_id': post_id,
+        'comments': _comments_page(request, post_id), }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    hits, next_cursor = post_search.search(
+        query, settings.NUM_POSTS, cursor=request.GET.get('cursor'))
+    context = {
+        'query': query,
+        'hits': hits,
+        'next_cursor': next_cursor, }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     groups = Group.objects.all()
@@ -119,12 +171,14 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@use_replica
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user).all()
-    paginator = Paginator(post_list, settings.NUM_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    entries = request.user.timeline.select_related(
+        'post__author', 'post__group')
+    paginator = TimelinePaginator(entries, settings.NUM_POSTS)
+    page_obj = paginator.get_page(
+        request.GET.get('page'), cursor=request.GET.get('cursor'))
     context = {
         'page_obj': page_obj, }
     return render(request, 'posts/follow.html', context)
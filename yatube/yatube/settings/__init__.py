@@ -0,0 +1,9 @@
+"""Настройки Yatube.
+
+``yatube.settings`` - это продакшен-профиль (``prod``), как и раньше,
+когда настройки были одним файлом: так его подхватывают manage.py, тесты
+и уже настроенные серверы. Для разработки с debug_toolbar::
+
+    DJANGO_SETTINGS_MODULE=yatube.settings.dev python manage.py runserver
+"""
+from .prod import *  # noqa: F401,F403
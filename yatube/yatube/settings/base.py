@@ -0,0 +1,272 @@
+"""
+Django settings for yatube project: common part of all profiles.
+
+Generated by 'django-admin startproject' using Django 2.2.19.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/2.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/2.2/ref/settings/
+"""
+
+import os
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+# Quick-start deve`lo`pment settings - unsuitable for production
+# See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = 'b5y02am!iqme+k6)k3^twggvag9ae!u4p$zglxp52d_#x5fnhl'
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+    'www.gplakhotnikov.pythonanywhere.com',
+    'gplakhotnikov.pythonanywhere.com',
+]
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'posts.apps.PostsConfig',
+    'users.apps.UsersConfig',
+    'core.apps.CoreConfig',
+    'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'sorl.thumbnail',
+    'rest_framework',
+    'rest_framework.authtoken',
+]
+
+MIDDLEWARE = [
+    'core.timing.TimingMiddleware',
+    'core.profiling.ProfilingMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'core.replicas.ReplicaMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+# Отдавать время базы, шаблонов и view в заголовке Server-Timing.
+SERVER_TIMING = True
+
+ROOT_URLCONF = 'yatube.urls'
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATES = [
+    {
+        'BACKEND': 'core.template_backends.DjangoTemplates',
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+
+# Разобрать URLconf и загрузить все шаблоны при импорте yatube.wsgi,
+# чтобы первый запрос к воркеру не платил за это (см. core.startup).
+WARM_UP_ON_STARTUP = False
+
+
+# Database
+# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+# Применяются к каждому новому соединению SQLite (см. core.sqlite).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 2 ** 20,
+    'cache_size': -32 * 2 ** 10,
+    'temp_store': 'memory',
+}
+
+# Повторы запросов, упавших с "database is locked": число и первая пауза.
+SQLITE_BUSY_RETRIES = 5
+SQLITE_BUSY_RETRY_DELAY = 0.05
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# Псевдонимы реплик, с которых читают ленты, профили и записи. Реплики
+# SQLite обновляет manage.py syncreplicas, например, по cron:
+# DATABASE_REPLICAS = ['replica']
+DATABASE_REPLICAS = []
+
+# Сколько секунд после записи пользователь читает из основной базы.
+REPLICA_PIN_SECONDS = 15
+
+# Как часто перепроверять доступность реплики, в секундах.
+REPLICA_HEALTH_INTERVAL = 5
+
+
+# Password validation
+# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+REST_FRAMEWORK = {
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated', 
+    ],
+
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.TokenAuthentication',
+    ],
+
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.PubDateCursorPagination',
+    'PAGE_SIZE': 10,
+} 
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.2/topics/i18n/
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+NUM_POSTS = 10
+
+NUM_COMMENTS = 20
+
+FEED_LENGTH = 50
+
+FEED_CHUNK_SIZE = 25
+
+TIMELINE_LENGTH = 1000
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.2/howto/static-files/
+
+STATIC_URL = '/static/'
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+
+LOGIN_URL = 'users:login'
+LOGIN_REDIRECT_URL = 'posts:index'
+
+# Письма только ставятся в очередь задач; отправляет их воркер
+# manage.py runworker через QUEUED_EMAIL_BACKEND (см. core.mail). Без
+# запущенного воркера почта, в том числе сброс пароля, не уходит.
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+
+QUEUED_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+            'MAX_SIZE': 256 * 2 ** 20,
+        },
+    }
+}
+
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+TASK_WORKERS = 2
+
+TASK_MAX_ATTEMPTS = 5
+
+# Задержка перед первым повтором задачи и ее предел, в секундах.
+TASK_RETRY_DELAY = 10
+TASK_RETRY_MAX_DELAY = 60 * 60
+
+# Сколько секунд задача считается занятой воркером.
+TASK_LEASE = 5 * 60
+
+# Общий для процессов файл метрик и как часто процесс сбрасывает туда
+# свои итоги, в секундах (см. core.metrics).
+METRICS_PATH = os.path.join(BASE_DIR, 'metrics.sqlite3')
+METRICS_FLUSH_INTERVAL = 10
+
+# Тесты пишут метрики и кэш во временный каталог (см. core.testing).
+TEST_RUNNER = 'core.testing.TestRunner'
+
+# С каких адресов доступен /metrics.
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Куда писать профили запросов (None - профилирование выключено), какую
+# долю запросов профилировать без токена, сколько секунд живет токен и
+# сколько профилей можно снять по одному токену.
+PROFILE_DIR = None
+PROFILE_SAMPLE_RATE = 0
+PROFILE_TOKEN_MAX_AGE = 60 * 60
+PROFILE_TOKEN_MAX_DUMPS = 20
+
+# Как часто снимать стек профилируемого запроса, в секундах.
+PROFILE_STACK_INTERVAL = 0.001
+
+# Собирать статистику SQL по отпечаткам (manage.py sqlreport) и с какого
+# времени, в секундах, запрос пишется в журнал медленных.
+SQL_STATS = True
+SLOW_QUERY_THRESHOLD = 0.1
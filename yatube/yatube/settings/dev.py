@@ -0,0 +1,20 @@
+"""Профиль разработки: отладка, debug_toolbar и профилирование."""
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import BASE_DIR, INSTALLED_APPS, MIDDLEWARE
+
+DEBUG = True
+
+INSTALLED_APPS = [*INSTALLED_APPS, 'debug_toolbar']
+
+MIDDLEWARE = [
+    *MIDDLEWARE,
+    'debug_toolbar.middleware.DebugToolbarMiddleware',
+]
+
+INTERNAL_IPS = [
+    '127.0.0.1',
+]
+
+PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
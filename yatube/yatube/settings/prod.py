@@ -0,0 +1,27 @@
+"""Продакшен-профиль: без отладочных приложений, шаблоны в памяти."""
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import SECRET_KEY, TEMPLATES
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', SECRET_KEY)
+
+DEBUG = False
+
+# Скомпилированные шаблоны держатся в памяти воркера; явный список
+# загрузчиков не дает кэшу пропасть, если кто-то включит 'debug'.
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
+WARM_UP_ON_STARTUP = True